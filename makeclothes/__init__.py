@@ -17,17 +17,27 @@ bl_info = {
     'wiki_url': "http://www.makehumancommunity.org/",
     "category": "MakeHuman"}
 
-from bpy.utils import register_class, unregister_class
-from .extraproperties import extraProperties
-from .makeclothes2 import MHC_PT_MakeClothesPanel
-from .infobox import MHC_OT_InfoBox,MHC_OT_WarningBox
-from .operators import *
+#
+# the numpy based modules (e.g. fitting.py, parallel.py) are also imported without blender, by the tests and
+# by the worker processes of the parallel fitting
+#
+try:
+    from bpy.utils import register_class, unregister_class
+except ImportError:
+    register_class = None
 
 MAKECLOTHES2_CLASSES = []
-MAKECLOTHES2_CLASSES.extend(OPERATOR_CLASSES)
-MAKECLOTHES2_CLASSES.append(MHC_PT_MakeClothesPanel)
-MAKECLOTHES2_CLASSES.append(MHC_OT_InfoBox)
-MAKECLOTHES2_CLASSES.append(MHC_OT_WarningBox)
+
+if register_class is not None:
+    from .extraproperties import extraProperties
+    from .makeclothes2 import MHC_PT_MakeClothesPanel
+    from .infobox import MHC_OT_InfoBox,MHC_OT_WarningBox
+    from .operators import *
+
+    MAKECLOTHES2_CLASSES.extend(OPERATOR_CLASSES)
+    MAKECLOTHES2_CLASSES.append(MHC_PT_MakeClothesPanel)
+    MAKECLOTHES2_CLASSES.append(MHC_OT_InfoBox)
+    MAKECLOTHES2_CLASSES.append(MHC_OT_WarningBox)
 
 __all__ = [
     "MHC_PT_MakeClothesPanel",
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# headless export of many clothes, to be used with blender in background mode:
+#
+# blender --background --python makeclothes/batch.py -- [options] file.blend|directory ...
+#
+# all objects marked as "Clothes" in all given .blend files (directories are searched for .blend files)
+# are exported without any user interface operator. A JSON report with timings and failures is written.
+#
+# options:
+#   --output DIR        root directory for the clothes (default: MakeHuman data folder)
+#   --subdir NAME       subdirectory below the data folder, default "clothes"
+#   --report FILE       JSON report, default is printing it
+#   --overwrite         replace existing geometry files
+#   --version2          export for MakeHuman version II (default: setting of the .blend file)
+#   --workers N         fit the clothes of a .blend file in N processes (default 1)
+#
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+if __name__ == "__main__" and not __package__:
+    # started as script, make relative imports work
+    #
+    _addonDir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(_addonDir))
+    __package__ = os.path.basename(_addonDir)
+    __import__(__package__)
+
+import bpy
+from mathutils import Matrix
+from .extraproperties import extraProperties
+from .sanitychecks import checkSanityHuman, checkSanityClothes
+from .core_makeclothes_functionality import MakeClothes
+from .parallel import fitClothesParallel
+from .utils import getClothesRoot
+
+def findBlendFiles(paths):
+    """
+    expand directories to all .blend files inside (recursive), files are taken as they are
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                for name in sorted(names):
+                    if name.endswith(".blend"):
+                        files.append(os.path.join(root, name))
+        else:
+            files.append(path)
+    return files
+
+def _applyTransform(obj):
+    """
+    same as transform_apply for location, rotation and scale, but without operator
+    """
+    if obj.matrix_world != Matrix.Identity(4):
+        obj.data.transform(obj.matrix_world)
+        obj.matrix_world = Matrix.Identity(4)
+
+def _applyShapeKeys(obj):
+    """
+    replace the mesh by the mix of all shape keys and remove them, like the export operator does
+    """
+    if obj.data.shape_keys is None:
+        return
+    mix = obj.shape_key_add(name="_applied", from_mix=True)
+    coords = np.zeros(len(obj.data.vertices) * 3, dtype=np.float32)
+    mix.data.foreach_get('co', coords)
+    obj.shape_key_clear()
+    obj.data.vertices.foreach_set('co', coords)
+    obj.data.update()
+
+def prepareClothes(context, clothesObj, humanObj, rootDir, overwrite=False, version2=False):
+    """
+    check and prepare one piece of clothes, returns (MakeClothes object or None, message)
+    """
+    (b, info, error) = checkSanityClothes(clothesObj, humanObj, markmesh=False, version2=version2)
+    if b:
+        return (None, error)
+
+    _applyTransform(clothesObj)
+    context.view_layer.update()
+
+    mc = MakeClothes(context, clothesObj.MhClothesName, rootDir)
+    (exists, dirname) = mc.mhcloExists()
+    if exists and not overwrite:
+        return (None, "Geometry file is already existent: " + dirname)
+
+    mc.params(clothesObj, humanObj, license=context.scene.MhClothesLicense, author=context.scene.MhClothesAuthor,
+            description=clothesObj.MhClothesDesc, overwriteMaterial=context.scene.MHOverwriteMat)
+    return (mc, dirname)
+
+def exportClothes(context, clothesObj, humanObj, rootDir, overwrite=False, version2=False):
+    """
+    export one piece of clothes, returns (success, message)
+    """
+    (mc, message) = prepareClothes(context, clothesObj, humanObj, rootDir, overwrite, version2)
+    if mc is None:
+        return (False, message)
+
+    (b, hint) = mc.make()
+    if b is False:
+        return (False, hint)
+    return (True, message)
+
+def exportBlendFile(filename, output=None, subdir="clothes", overwrite=False, version2=None, workers=1):
+    """
+    load a .blend file and export all clothes in it, returns a list of report entries
+
+    with more than one worker all clothes are prepared first, then fitted in parallel and written afterwards
+    """
+    entries = []
+    start = time.perf_counter()
+    try:
+        bpy.ops.wm.open_mainfile(filepath=filename)
+    except RuntimeError as e:
+        return [{ "file": filename, "object": None, "status": "failed", "error": str(e), "seconds": time.perf_counter() - start }]
+
+    context = bpy.context
+    if version2 is None:
+        version2 = context.scene.MHVersion
+
+    (b, info, error) = checkSanityHuman(context)
+    humanObj = None
+    for obj in context.scene.objects:
+        if hasattr(obj, "MhObjectType") and obj.MhObjectType == "Basemesh":
+            humanObj = obj
+            break
+
+    if b or humanObj is None:
+        return [{ "file": filename, "object": None, "status": "failed", "error": error or "No human found", "seconds": time.perf_counter() - start }]
+
+    _applyTransform(humanObj)
+    _applyShapeKeys(humanObj)
+
+    if output:
+        rootDir = output
+    else:
+        rootDir = getClothesRoot(version2, humanObj.MhMeshType, subdir)
+
+    clothesObjs = []
+    for obj in context.scene.objects:
+        if obj.type == "MESH" and hasattr(obj, "MhObjectType") and obj.MhObjectType == "Clothes":
+            clothesObjs.append(obj)
+
+    if workers > 1:
+        return _exportParallel(context, filename, clothesObjs, humanObj, rootDir, overwrite, version2, workers)
+
+    for obj in clothesObjs:
+        itemStart = time.perf_counter()
+        try:
+            (b, message) = exportClothes(context, obj, humanObj, rootDir, overwrite, version2)
+        except Exception as e:
+            (b, message) = (False, type(e).__name__ + ": " + str(e))
+        entries.append(_reportEntry(filename, obj, b, message, time.perf_counter() - itemStart))
+    return entries
+
+def _reportEntry(filename, obj, success, message, seconds):
+    entry = { "file": filename, "object": obj.name, "name": obj.MhClothesName,
+            "status": "ok" if success else "failed", "seconds": seconds }
+    if success:
+        entry["destination"] = message
+    else:
+        entry["error"] = message
+    return entry
+
+def _exportParallel(context, filename, clothesObjs, humanObj, rootDir, overwrite, version2, workers):
+    """
+    prepare all clothes, do the fitting in worker processes and write the results
+    the time of the common fitting is distributed equally to all fitted clothes
+    """
+    entries = []
+    prepared = []
+    for obj in clothesObjs:
+        itemStart = time.perf_counter()
+        try:
+            (mc, message) = prepareClothes(context, obj, humanObj, rootDir, overwrite, version2)
+        except Exception as e:
+            (mc, message) = (None, type(e).__name__ + ": " + str(e))
+        if mc is None:
+            entries.append(_reportEntry(filename, obj, False, message, time.perf_counter() - itemStart))
+        else:
+            prepared.append((obj, mc, message, time.perf_counter() - itemStart))
+
+    if len(prepared) == 0:
+        return entries
+
+    fitStart = time.perf_counter()
+    humanmesh = prepared[0][1].humanmesh
+    fitResults = fitClothesParallel(humanmesh, [mc.clothesmesh for (obj, mc, message, seconds) in prepared], workers, context.scene.MHFittingMode)
+    fitSeconds = (time.perf_counter() - fitStart) / len(prepared)
+
+    for ((obj, mc, message, seconds), fitResult) in zip(prepared, fitResults):
+        itemStart = time.perf_counter()
+        try:
+            (b, hint) = mc.make(fitResult)
+            if b is False:
+                message = hint
+        except Exception as e:
+            (b, message) = (False, type(e).__name__ + ": " + str(e))
+        entries.append(_reportEntry(filename, obj, b, message, seconds + fitSeconds + time.perf_counter() - itemStart))
+    return entries
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog="makeclothes.batch", description="Export all clothes of .blend files without user interface")
+    parser.add_argument("paths", nargs="+", help=".blend files or directories containing .blend files")
+    parser.add_argument("--output", default=None, help="root directory for the clothes")
+    parser.add_argument("--subdir", default="clothes", help="subdirectory of the MakeHuman data folder")
+    parser.add_argument("--report", default=None, help="write JSON report to this file")
+    parser.add_argument("--overwrite", action="store_true", help="replace existing geometry files")
+    parser.add_argument("--version2", action="store_true", default=None, help="export for MakeHuman version II")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used for fitting")
+    args = parser.parse_args(argv)
+
+    if not hasattr(bpy.types.Scene, "MHDebugFile"):
+        extraProperties()
+
+    start = time.perf_counter()
+    items = []
+    for filename in findBlendFiles(args.paths):
+        items.extend(exportBlendFile(filename, args.output, args.subdir, args.overwrite, args.version2, args.workers))
+
+    report = {
+        "items": items,
+        "exported": len([i for i in items if i["status"] == "ok"]),
+        "failed": len([i for i in items if i["status"] != "ok"]),
+        "seconds": time.perf_counter() - start,
+        "workers": args.workers
+    }
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# benchmark of export and import on synthetic meshes of increasing size:
+#
+# python makeclothes/benchmark.py [options]
+# blender --background --python makeclothes/benchmark.py -- [options]
+#
+# human and clothes are cylinders of quads and triangles with UVs (including a seam) and one vertex group
+# per band of rows. Without blender the fitting stages, the incremental refit, the parallel fitting, the verts
+# section of the .mhclo file and the parser are measured on arrays. With blender the meshes are created as
+# objects and additionally the complete export of MakeClothes (mesh indexing, UV welding, all writers), the
+# reading of the vertex groups and the refit of the import are measured.
+#
+# the result is written as JSON, seconds are summed over all calls of a stage (see profiling.py).
+#
+# options:
+#   --sizes N,N,...     number of vertices of human and clothes (default 1000,10000,100000,1000000)
+#   --groups N          number of vertex groups (default 8)
+#   --workers N,N,...   fit as many pieces of clothes as the largest number with each number of processes,
+#                       e.g. 1,2,4,8 for a scaling curve (default 1, no parallel fitting)
+#   --memory            measure the memory peak of each stage with tracemalloc
+#   --output FILE       JSON result, default is printing it
+#
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+
+if __name__ == "__main__" and not __package__:
+    # started as script, make relative imports work
+    #
+    _addonDir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(_addonDir))
+    __package__ = os.path.basename(_addonDir)
+    __import__(__package__)
+
+from .fitting import meshFromArrays, VertexMatchTable, fitClothes, findClosestVertices, findClosestTriangles, \
+        findBestFaces, findExactNeighbors, findWeightsAndDistances
+from .fitcache import writeFitCache, readFitCache
+from .mhcloparser import readMhclo
+from .parallel import fitClothesParallel
+from .profiling import StageProfiler
+from .synthetic import syntheticPair
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+_FORMAT_CHUNK = 65536           # same as the .mhclo writer
+_MOVED = 0.01                   # part of the clothes vertices moved for the incremental refit
+
+def _arraysMesh(synthetic, edges):
+    return meshFromArrays(synthetic["coords"], synthetic["polyLoopTotal"], synthetic["polyVertices"],
+            synthetic["vertexGroupNames"], synthetic["membership"], edges)
+
+def _meanOffset(table):
+    return float(np.linalg.norm(table.offsets, axis=1).mean())
+
+def arraysSuite(humanData, clothesData, workers, tmpDir, memory=False):
+    """
+    measure the parts which do not need blender, returns (timings, quality)
+    workers is a list of numbers of processes, used for fitting max(workers) pieces of clothes each time
+    """
+    profiler = StageProfiler(True, memory)
+    stage = profiler.stage
+    quality = {}
+
+    with stage("humanIndices"):
+        human = _arraysMesh(humanData, False)
+    with stage("clothesIndices"):
+        clothes = _arraysMesh(clothesData, True)
+
+    # closest vertices, the same order as MakeClothes.make
+    #
+    table = VertexMatchTable(len(clothes.allVertexCoordinates))
+    with stage("findClosestVertices"):
+        (b, text, isTriangle) = findClosestVertices(human, clothes, table)
+    if b is False:
+        raise ValueError(text)
+    with stage("findBestFaces"):
+        findBestFaces(human, clothes, table)
+    with stage("findExactNeighbors"):
+        findExactNeighbors(human, clothes, table)
+    with stage("findWeightsAndDistances"):
+        findWeightsAndDistances(human, clothes, table)
+    quality["VERTEX"] = _meanOffset(table)
+
+    surface = VertexMatchTable(len(clothes.allVertexCoordinates))
+    with stage("findClosestTriangles"):
+        findClosestTriangles(human, clothes, surface)
+    with stage("findWeightsAndDistancesSurface"):
+        findWeightsAndDistances(human, clothes, surface)
+    quality["SURFACE"] = _meanOffset(surface)
+
+    # verts section of the .mhclo file and the parser
+    #
+    filename = os.path.join(tmpDir, "arrays.mhclo")
+    with stage("formatMhcloVerts"):
+        lines = [table.formatLines(start, start + _FORMAT_CHUNK) for start in range(0, len(table), _FORMAT_CHUNK)]
+    with open(filename, "w") as f:
+        f.write("verts 0\n" + "".join(lines))
+    with stage("readMhclo"):
+        readMhclo(filename)
+
+    # scaling of the parallel fitting, the same pieces with different numbers of processes (1 is fitted serially)
+    #
+    pieces = max(workers)
+    if pieces > 1:
+        for numWorkers in workers:
+            with stage("fitWorkers" + str(numWorkers)):
+                fitClothesParallel(human, [clothes] * pieces, numWorkers)
+
+    # incremental export after a part of the vertices has been moved
+    #
+    filename = os.path.join(tmpDir, "arrays.fitcache.npz")
+    with stage("writeFitCache"):
+        writeFitCache(filename, human, clothes, table, isTriangle, "VERTEX")
+    moved = np.arange(0, len(clothes.allVertexCoordinates), int(1 / _MOVED))
+    clothes.allVertexCoordinates[moved] += (0.0, 0.0, 0.001)
+    with stage("readFitCache"):
+        (cached, isTriangle, rows) = readFitCache(filename, human, clothes, "VERTEX")
+    with stage("refit"):
+        fitClothes(human, clothes, table=cached, rows=rows)
+    quality["refitRows"] = len(rows)
+
+    profiler.stop()
+    return (profiler.results(), quality)
+
+def _createObject(context, name, synthetic):
+    """
+    blender object of a synthetic mesh, created with foreach_set like the extraction of clothes
+    """
+    coords = synthetic["coords"]
+    loopTotal = synthetic["polyLoopTotal"]
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set('co', coords.astype(np.float32).ravel())
+    mesh.loops.add(len(synthetic["polyVertices"]))
+    mesh.loops.foreach_set('vertex_index', synthetic["polyVertices"])
+    mesh.polygons.add(len(loopTotal))
+    mesh.polygons.foreach_set('loop_start', (np.cumsum(loopTotal) - loopTotal).astype(np.int32))
+    layer = mesh.uv_layers.new(name="UVMap")
+    layer.data.foreach_set('uv', synthetic["uvs"].ravel())
+    mesh.update(calc_edges=True)
+
+    obj = bpy.data.objects.new(name, mesh)
+    context.scene.collection.objects.link(obj)
+    (verts, groups, weights) = synthetic["membership"]
+    for (index, groupName) in sorted(synthetic["vertexGroupNames"].items()):
+        vg = obj.vertex_groups.new(name=groupName)
+        vg.add(verts[groups == index].tolist(), 1.0, 'REPLACE')
+    return obj
+
+def _rangeConfig(synthetic):
+    """
+    mesh configuration with "groups_by_range" for the synthetic human, see mhmesh.rangeMembership
+    """
+    (verts, groups, weights) = synthetic["membership"]
+    ranges = {}
+    for (index, groupName) in synthetic["vertexGroupNames"].items():
+        member = verts[groups == index]
+        ranges[groupName] = [int(member.min()), int(member.max())]
+    return { "vertices": len(synthetic["coords"]), "groups_by_range": ranges }
+
+def blenderSuite(context, humanData, clothesData, tmpDir, memory=False):
+    """
+    measure export and import with blender objects, returns the timings
+    """
+    from .core_makeclothes_functionality import MakeClothes, _loadMeshJson
+    from .humancache import clearHumanCache
+    from .mhmesh import vertexGroupMembership, rangeMembership
+    from .operators.importmhclo import import_mhclo
+
+    profiler = StageProfiler(True, memory)
+    stage = profiler.stage
+
+    with stage("createObjects"):
+        humanObj = _createObject(context, "benchmark_human", humanData)
+        clothesObj = _createObject(context, "benchmark_clothes", clothesData)
+
+    humanObj.MhObjectType = "Basemesh"
+    (baseMeshType, meshConfig) = _loadMeshJson(humanObj)
+    clothesObj.MhObjectType = "Clothes"
+    clothesObj.MhClothesName = "benchmark"
+    clothesObj.MhOffsetScale = sorted(meshConfig["dimensions"].keys())[0]
+    clothesObj.MhDeleteGroup = humanData["vertexGroupNames"][len(humanData["vertexGroupNames"]) // 2]
+
+    # vertex groups read from all vertices or taken from the ranges of the configuration
+    #
+    with stage("vertexGroupMembership"):
+        vertexGroupMembership(humanObj.data)
+    with stage("rangeMembership"):
+        rangeMembership(humanObj, _rangeConfig(humanData))
+
+    scene = context.scene
+    scene.MHProfile = True
+    scene.MHProfileMemory = memory
+    scene.MHIncremental = False
+    scene.MHUseGroupRanges = False
+    scene.MHDebugFile = False
+    scene.MHAllowMods = False
+    scene.MhMcMakeSkin = False
+
+    results = {}
+    for mode in ("VERTEX", "SURFACE"):
+        scene.MHFittingMode = mode
+        clearHumanCache()
+        mc = MakeClothes(context, "benchmark_" + mode.lower(), tmpDir)
+        mc.params(clothesObj, humanObj)
+        (b, hint) = mc.make()
+        if b is False:
+            raise ValueError(hint)
+        results[mode] = mc.getProfile()
+
+    # import of the written file: parser and refit of the clothes to the human
+    #
+    with stage("readMhclo"):
+        data = readMhclo(mc.namePrefix + ".mhclo")
+    im = import_mhclo()
+    (im.xs, im.ys, im.zs) = (data.xs, data.ys, data.zs)
+    (im.indices, im.weights, im.offsets) = (data.indices, data.weights, data.offsets)
+    (im.delverts, im.delete) = (data.delverts, data.delete)
+    im.clothes = clothesObj
+    with stage("refitMhclo"):
+        im.update(humanObj)
+
+    profiler.stop()
+    results["common"] = profiler.results()
+
+    for obj in (humanObj, clothesObj):
+        mesh = obj.data
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
+    return results
+
+def _versions():
+    versions = { "python": platform.python_version(), "numpy": np.__version__, "scipy": None, "blender": None, "commit": None }
+    try:
+        import scipy
+        versions["scipy"] = scipy.__version__
+    except ImportError:
+        pass
+    if bpy is not None:
+        versions["blender"] = bpy.app.version_string
+    try:
+        versions["commit"] = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return versions
+
+def main(argv=None):
+    if argv is None:
+        if "--" in sys.argv:
+            argv = sys.argv[sys.argv.index("--") + 1:]
+        else:
+            argv = [] if bpy is not None else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(prog="makeclothes.benchmark", description="Benchmark of MakeClothes on synthetic meshes")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="comma-separated numbers of vertices")
+    parser.add_argument("--groups", type=int, default=8, help="number of vertex groups")
+    parser.add_argument("--workers", default="1", help="comma-separated numbers of processes used for fitting, e.g. 1,2,4,8")
+    parser.add_argument("--memory", action="store_true", help="measure memory peaks with tracemalloc")
+    parser.add_argument("--output", default=None, help="write JSON result to this file")
+    args = parser.parse_args(argv)
+    workers = [int(w) for w in args.workers.split(",")]
+
+    if bpy is not None and not hasattr(bpy.types.Scene, "MHProfile"):
+        from .extraproperties import extraProperties
+        extraProperties()
+
+    report = { "versions": _versions(), "date": time.strftime("%Y-%m-%d %H:%M:%S"), "groups": args.groups,
+            "workers": workers, "sizes": {} }
+
+    tmpDir = tempfile.mkdtemp(prefix="makeclothes_benchmark_")
+    try:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            (humanData, clothesData) = syntheticPair(size, args.groups)
+            entry = { "vertices": len(clothesData["coords"]), "polygons": len(clothesData["polyLoopTotal"]) }
+            (entry["arrays"], entry["quality"]) = arraysSuite(humanData, clothesData, workers, tmpDir, args.memory)
+            if bpy is not None:
+                entry["blender"] = blenderSuite(bpy.context, humanData, clothesData, tmpDir, args.memory)
+            report["sizes"][str(size)] = entry
+            print("benchmark: " + str(size) + " vertices done", file=sys.stderr)
+    finally:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,6 +32,11 @@ _destination.append(("tongue", "tongue", "Tongue subdir", 6))
 _destination_description = "This is the subdirectory (under data) where we should put the produced clothes"
 _datafolder_description = "Add an alternative folder to write files, if none was given."
 
+_fittingModes = []
+_fittingModes.append(("VERTEX",  "Closest vertices", "Use the three closest vertices of the human, then search for the best face", 1))
+_fittingModes.append(("SURFACE", "Closest surface",  "Use the triangle of the human surface with the closest point", 2))
+_fittingDescription = "Method to find the vertices of the human each vertex of the clothes is attached to"
+
 mh_tags = {}
 mh_readitem = []
 
@@ -98,6 +103,11 @@ def extraProperties():
     bpy.types.Scene.MHOverwrite = BoolProperty(name="Overwrite existent geometry", description="Must be marked, if you want to replace old geometry files (.mhclo, .obj)", default=False)
     bpy.types.Scene.MHOverwriteMat = BoolProperty(name="Overwrite existent material", description="Must be marked, if you want to replace old material (.mhmat file)", default=False)
     bpy.types.Scene.MHAllowMods = BoolProperty(name="Allow modifiers", description="Must be marked, if modifiers should be taken into account", default=True)
+    bpy.types.Scene.MHFittingMode = EnumProperty(items=_fittingModes, name="Fitting mode", description=_fittingDescription, default="VERTEX")
+    bpy.types.Scene.MHIncremental = BoolProperty(name="Incremental export", description="Must be marked, if only changed vertices should be fitted again. The result of the fitting is saved in an additional file next to the .mhclo file", default=False)
+    bpy.types.Scene.MHUseGroupRanges = BoolProperty(name="Use group ranges", description="Must be marked, if the vertex groups of a known base mesh should be taken from the ranges of its configuration instead of reading them from the vertices. Only use it for an unchanged base mesh, check human verifies the ranges", default=False)
+    bpy.types.Scene.MHProfile = BoolProperty(name="Profile export", description="Must be marked, if the time of each step of the export should be measured. The result is shown and saved in an additional file next to the .mhclo file", default=False)
+    bpy.types.Scene.MHProfileMemory = BoolProperty(name="Profile memory", description="Must be marked, if additionally the memory peak of each step should be measured. This slows down the export", default=False)
     bpy.types.Scene.MHDebugFile = BoolProperty(name="Save debug file", description="Must be marked, if a debug file should be saved", default=False)
     bpy.types.Scene.MhMcMakeSkin = BoolProperty(name="Use makeskin", description="Use MakeSkin (if available) for writing material. This will be silently ignored if MakeSkin is not installed. For this to work you should have created the object's material using MakeSkin.", default=False)
 
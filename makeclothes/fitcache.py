@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# cache of a fitting result for incremental export, only numpy is used
+#
+# the cache is written next to the .mhclo file (<name>.fitcache.npz). It contains the input of each clothes
+# vertex (coordinate and vertex group) and the resulting row of the VertexMatchTable. The human and the
+# topology of the clothes are only compared by a hash, if one of them changes, everything is fitted again.
+#
+
+import hashlib
+import numpy as np
+
+from .fitting import VertexMatchTable
+
+_FIT_CACHE_VERSION = 1
+_FIT_CACHE_KEYS = ("version", "mode", "isTriangle", "human", "topology", "coords", "groups", "indices", "weights", "offsets", "exact")
+
+def fitCacheName(namePrefix):
+    return namePrefix + ".fitcache.npz"
+
+def _hashArrays(*arrays):
+    sha = hashlib.sha1()
+    for value in arrays:
+        value = np.ascontiguousarray(value)
+        sha.update(str(value.dtype).encode())
+        sha.update(str(value.shape).encode())
+        sha.update(value.tobytes())
+    return sha.hexdigest()
+
+def humanHash(human):
+    """
+    hash of everything of the human used for fitting: coordinates, groups and polygons
+    """
+    names = np.array([str(g) + ":" + human.vertexGroupNames[g] for g in sorted(human.vertexGroupNames.keys())])
+    return _hashArrays(human.allVertexCoordinates.astype(np.float64), human.groupStart, human.groupVertices,
+            human.polyStart, human.polyVertices, names)
+
+def topologyHash(clothes):
+    """
+    hash of the polygons and edges of the clothes, the coordinates are compared per vertex
+    """
+    return _hashArrays(clothes.polyStart, clothes.polyVertices, np.sort(clothes.edgeVertices, axis=1))
+
+def vertexGroupPerVertex(clothes):
+    """
+    name of the vertex group of each vertex ("" if there is none), the last group wins like in the fitting
+    """
+    groups = np.full(len(clothes.allVertexCoordinates), "", dtype=object)
+    for groupIndex in clothes.vertexGroupNames.keys():
+        groups[clothes.vertexGroupVertices[groupIndex]] = clothes.vertexGroupNames[groupIndex]
+    return groups.astype(str)
+
+def writeFitCache(filename, human, clothes, table, isTriangle, mode):
+    """
+    save the fitting result, returns (success, error text)
+    """
+    try:
+        with open(filename, "wb") as f:
+            np.savez(f, version=_FIT_CACHE_VERSION, mode=mode, isTriangle=isTriangle,
+                    human=humanHash(human), topology=topologyHash(clothes),
+                    coords=clothes.allVertexCoordinates.astype(np.float64), groups=vertexGroupPerVertex(clothes),
+                    indices=table.indices, weights=table.weights, offsets=table.offsets, exact=table.exact)
+    except IOError as e:
+        return (False, "Cannot write fitting cache " + filename + ": " + str(e))
+    return (True, "")
+
+def readFitCache(filename, human, clothes, mode):
+    """
+    read a saved fitting result and compare it with the current input
+
+    returns (VertexMatchTable, isTriangle, rows) where rows are the clothes vertices to be fitted again,
+    None instead of the tuple means the cache cannot be used and all vertices must be fitted
+    """
+    # a missing, truncated or foreign file (no zip archive, other keys or shapes) is only a cache miss
+    #
+    coords = clothes.allVertexCoordinates.astype(np.float64)
+    try:
+        with np.load(filename, allow_pickle=False) as cache:
+            data = dict((key, cache[key]) for key in _FIT_CACHE_KEYS)
+        if int(data["version"]) != _FIT_CACHE_VERSION or str(data["mode"]) != mode:
+            return None
+        if data["coords"].shape != coords.shape or data["groups"].shape != (len(coords),) or data["exact"].shape != (len(coords),) \
+                or any(data[key].shape != (len(coords), 3) for key in ("indices", "weights", "offsets")):
+            return None
+        if str(data["human"]) != humanHash(human) or str(data["topology"]) != topologyHash(clothes):
+            return None
+
+        table = VertexMatchTable(len(coords))
+        table.indices[:] = data["indices"]
+        table.weights[:] = data["weights"]
+        table.offsets[:] = data["offsets"]
+        table.exact[:] = data["exact"]
+    except Exception:
+        return None
+
+    # a vertex is changed when its position or its group differs, the neighbors are also fitted again,
+    # because the exact matches of the neighbors are used in findExactNeighbors
+    #
+    changed = (coords != data["coords"]).any(axis=1) | (vertexGroupPerVertex(clothes) != data["groups"])
+    edges = clothes.edgeVertices
+    touched = changed[edges].any(axis=1)
+    changed[edges[touched].ravel()] = True
+    return (table, bool(data["isTriangle"]), np.flatnonzero(changed))
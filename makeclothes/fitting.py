@@ -0,0 +1,913 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# the fitting algorithm of MakeClothes, it only uses numpy and works on arrays, so it does not need blender
+# (used in worker processes for parallel fitting).
+#
+# human and clothes are MeshArrays (MHMesh is the blender adapter of it, meshFromArrays creates one from plain
+# arrays). The result is a VertexMatchTable, its formatLines method delivers the verts section of the mhclo file:
+#
+# findClosestVertices -> findBestFaces -> findExactNeighbors -> findWeightsAndDistances
+#
+# or in fitting mode "SURFACE" (the closest point on the triangulated human surface):
+#
+# findClosestTriangles -> findWeightsAndDistances
+#
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree     # not part of blender, but used when installed
+except ImportError:
+    cKDTree = None
+
+_GRID_CELL_POINTS = 4                       # wanted mean number of vertices per occupied cell of the search grid
+_GRID_RINGS = 2                             # rings of cells searched one by one around a point, then the rings grow by half
+_GRID_CHUNK = 8192                          # number of points searched at once in the grid
+_BRUTE_FORCE_SIZE = 1 << 22                 # number of distances calculated at once without grid
+_FACE_CHUNK = 65536                         # number of clothes vertices evaluated at once to find the best faces
+_TRIANGLE_CANDIDATES = 16                   # number of triangles (closest centroids) tested first per clothes vertex
+
+def _csr(keys, values, numKeys):
+    """
+    sort values by keys (stable), returns start array (numKeys+1) and the sorted values,
+    values[start[k]:start[k+1]] then belong to key k
+    """
+    order = np.argsort(keys, kind='stable')
+    start = np.zeros(numKeys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=numKeys), out=start[1:])
+    return (start, values[order])
+
+class VertexGroupTree:
+
+    def __init__(self, coords, indices):
+        """
+        Nearest neighbour search on the vertices of one vertex group.
+
+        coords: (N,3) array of the vertex coordinates of the group
+        indices: the vertex numbers of these coordinates in the complete mesh
+
+        scipy's cKDTree is used when it is installed, otherwise the vertices are sorted into a uniform grid.
+        The grid only needs numpy, blender does not ship scipy, so inside and outside of blender the same
+        vertices are found.
+        """
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.size = len(self.indices)
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+
+        if cKDTree is not None:
+            self._tree = cKDTree(coords)
+        else:
+            self._tree = None
+            self._buildGrid(coords)
+
+    def _buildGrid(self, coords):
+        # the cell size is first calculated for vertices filling their bounding box, vertices on a surface
+        # use less cells, so the size is corrected once with the real number of occupied cells
+        #
+        self._coords = coords
+        self._low = coords.min(axis=0)
+        extent = coords.max(axis=0) - self._low
+        floor = max(float(extent.max()), 1e-9) * 1e-3
+        self._cell = float((np.prod(np.maximum(extent, floor)) * _GRID_CELL_POINTS / self.size) ** (1.0 / 3.0))
+        keys = self._sortIntoCells(extent)
+        occupied = np.count_nonzero(np.diff(keys)) + 1
+        self._cell *= float(np.sqrt(occupied * _GRID_CELL_POINTS / self.size))
+        keys = self._sortIntoCells(extent)
+
+        # vertices of cell self._cellKeys[k] are self._order[self._cellStart[k]:self._cellStart[k+1]]
+        #
+        (self._cellKeys, first) = np.unique(keys, return_index=True)
+        self._cellStart = np.append(first, self.size)
+
+    def _sortIntoCells(self, extent):
+        self._dims = (extent // self._cell).astype(np.int64) + 1
+        cells = np.minimum(np.floor((self._coords - self._low) / self._cell).astype(np.int64), self._dims - 1)
+        keys = (cells[:, 0] * self._dims[1] + cells[:, 1]) * self._dims[2] + cells[:, 2]
+        self._order = np.argsort(keys, kind='stable')
+        return keys[self._order]
+
+    def query(self, points, n=3):
+        """
+        find the n closest vertices for each of the (N,3) points
+
+        returns vertex numbers (N,n) of the complete mesh and distances (N,n), sorted by distance
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if self._tree is not None:
+            (distances, positions) = self._tree.query(points, k=n)
+            distances = distances.reshape(-1, n)
+            return (self.indices[positions.reshape(-1, n)], distances)
+
+        positions = np.zeros((len(points), n), dtype=np.int64)
+        distances = np.zeros((len(points), n), dtype=np.float64)
+        for start in range(0, len(points), _GRID_CHUNK):
+            chunk = slice(start, start + _GRID_CHUNK)
+            (positions[chunk], distances[chunk]) = self._gridSearch(points[chunk], n)
+        return (self.indices[positions], distances)
+
+    def _gridSearch(self, points, n):
+        # search the cells around each point, a result is certain when the n-th distance is not larger
+        # than the distance of the point to the border of the searched cells, the others are searched
+        # with more rings, only points still open when the rings cover the whole grid are compared with
+        # all vertices. Points outside of the grid start in the closest cell of the grid
+        #
+        positions = np.zeros((len(points), n), dtype=np.int64)
+        distances = np.zeros((len(points), n), dtype=np.float64)
+        cells = np.clip(np.floor((points - self._low) / self._cell).astype(np.int64), 0, self._dims - 1)
+        pending = np.arange(len(points))
+        ring = 1
+        while len(pending) > 0 and ring < self._dims.max():
+            # the number of points per call is limited, so the matrix of candidates stays small for wide rings
+            #
+            chunkSize = max(1, _BRUTE_FORCE_SIZE // (_GRID_CELL_POINTS * (2 * ring + 1) ** 3))
+            stillPending = []
+            for start in range(0, len(pending), chunkSize):
+                chunk = pending[start:start + chunkSize]
+                (found, ringPositions, ringDistances) = self._ringSearch(points[chunk], cells[chunk], n, ring)
+                positions[chunk[found]] = ringPositions[found]
+                distances[chunk[found]] = ringDistances[found]
+                stillPending.append(chunk[~found])
+            pending = np.concatenate(stillPending)
+            ring = ring + 1 if ring < _GRID_RINGS else ring * 3 // 2
+
+        if len(pending) > 0:
+            (positions[pending], distances[pending]) = self._bruteForce(points[pending], n)
+        return (positions, distances)
+
+    def _ringSearch(self, points, cells, n, ring):
+        steps = np.arange(-ring, ring + 1)
+        offsets = np.stack(np.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3)
+        neighbors = cells[:, None, :] + offsets[None, :, :]
+        keys = (neighbors[:, :, 0] * self._dims[1] + neighbors[:, :, 1]) * self._dims[2] + neighbors[:, :, 2]
+        slot = np.minimum(np.searchsorted(self._cellKeys, keys), len(self._cellKeys) - 1)
+        used = ((neighbors >= 0) & (neighbors < self._dims)).all(axis=2) & (self._cellKeys[slot] == keys)
+        counts = np.where(used, self._cellStart[slot + 1] - self._cellStart[slot], 0).ravel()
+        rowCounts = counts.reshape(len(points), -1).sum(axis=1)
+
+        found = np.zeros(len(points), dtype=bool)
+        positions = np.zeros((len(points), n), dtype=np.int64)
+        distances = np.zeros((len(points), n), dtype=np.float64)
+        width = int(rowCounts.max()) if len(points) > 0 else 0
+        if width < n:
+            return (found, positions, distances)
+
+        # all vertices of the cells of a point form one row of a matrix, filled up with infinite distances
+        #
+        total = int(counts.sum())
+        entryRow = np.repeat(np.arange(len(points)), rowCounts)
+        entryColumn = np.arange(total) - np.repeat(np.cumsum(rowCounts) - rowCounts, rowCounts)
+        entryVertex = self._order[np.repeat(self._cellStart[slot].ravel() - (np.cumsum(counts) - counts), counts) + np.arange(total)]
+        difference = points[entryRow] - self._coords[entryVertex]
+        squared = np.full((len(points), width), np.inf)
+        squared[entryRow, entryColumn] = _dot(difference, difference)
+        candidates = np.zeros((len(points), width), dtype=np.int64)
+        candidates[entryRow, entryColumn] = entryVertex
+
+        nearest = np.argpartition(squared, n - 1, axis=1)[:, :n]
+        nearestSquared = np.take_along_axis(squared, nearest, axis=1)
+        nearestVertices = np.take_along_axis(candidates, nearest, axis=1)
+        order = np.lexsort((nearestVertices, nearestSquared), axis=1)
+        positions = np.take_along_axis(nearestVertices, order, axis=1)
+        distances = np.sqrt(np.take_along_axis(nearestSquared, order, axis=1))
+
+        # distance to the border of the searched cells, there are no vertices beyond the border of the grid
+        #
+        lower = np.where(cells - ring > 0, points - (self._low + (cells - ring) * self._cell), np.inf)
+        upper = np.where(cells + ring < self._dims - 1, self._low + (cells + ring + 1) * self._cell - points, np.inf)
+        border = np.minimum(lower, upper).min(axis=1)
+        found = (rowCounts >= n) & (distances[:, -1] <= border)
+        return (found, positions, distances)
+
+    def _bruteForce(self, points, n):
+        # compare chunks of points with all vertices, |p-c|^2 = |p|^2 - 2 p.c + |c|^2, only the n smallest are sorted
+        #
+        positions = np.zeros((len(points), n), dtype=np.int64)
+        distances = np.zeros((len(points), n), dtype=np.float64)
+        coordsSquared = _dot(self._coords, self._coords)
+        chunkSize = max(1, _BRUTE_FORCE_SIZE // self.size)
+        for start in range(0, len(points), chunkSize):
+            chunk = points[start:start + chunkSize]
+            squared = coordsSquared[None, :] - 2.0 * (chunk @ self._coords.T)
+            squared += _dot(chunk, chunk)[:, None]
+            nearest = np.argpartition(squared, n - 1, axis=1)[:, :n]
+            nearestSquared = np.take_along_axis(squared, nearest, axis=1)
+            order = np.lexsort((nearest, nearestSquared), axis=1)
+            positions[start:start + len(chunk)] = np.take_along_axis(nearest, order, axis=1)
+            distances[start:start + len(chunk)] = np.sqrt(np.maximum(np.take_along_axis(nearestSquared, order, axis=1), 0.0))
+        return (positions, distances)
+
+class MeshArrays:
+
+    # names of all arrays a mesh can carry, used to transfer them to other processes
+    #
+    ARRAYS = [ "allVertexCoordinates", "groupStart", "groupVertices", "groupWeights",
+            "polyStart", "polyLoopTotal", "polyVertices", "vertPolyStart", "vertPolyIndex", "faceCentroids",
+            "edgeVertices", "vertEdgeStart", "vertEdgeIndex" ]
+
+    def __init__(self):
+        """
+        The mesh data needed for fitting as numpy arrays, most of them in compressed sparse row layout.
+
+        vertexGroupNames: A mapping between each vertex groups's index and its name
+        vertexGroupVertices: The vertex numbers of the vertices in the group, a slice of groupVertices
+        """
+        self.vertexGroupNames = dict()
+        self.vertexGroupVertices = dict()
+        self._groupTrees = dict()   # search trees per vertex group name, created on demand
+        self._groupTriangles = dict()   # triangles and search trees of their centroids per vertex group name
+        for name in self.ARRAYS:
+            setattr(self, name, None)
+
+        # only needed while creating the indices or for export
+        #
+        self.loopPolygons = None    # polygon number of each entry in polyVertices
+        self.max_poles = 0
+
+    def toArrays(self):
+        """
+        returns all arrays which are set as a dict
+        """
+        arrays = dict()
+        for name in self.ARRAYS:
+            value = getattr(self, name)
+            if value is not None:
+                arrays[name] = value
+        return arrays
+
+    @staticmethod
+    def fromArrays(arrays, vertexGroupNames):
+        """
+        create a mesh from the result of toArrays and the vertex group names
+        """
+        mesh = MeshArrays()
+        for name in arrays:
+            setattr(mesh, name, arrays[name])
+        mesh.vertexGroupNames = dict(vertexGroupNames)
+        mesh._sliceGroups()
+        return mesh
+
+    def _sliceGroups(self):
+        for groupIndex in self.vertexGroupNames.keys():
+            self.vertexGroupVertices[groupIndex] = self.groupVertices[self.groupStart[groupIndex]:self.groupStart[groupIndex + 1]]
+
+    def setGroups(self, verts, groups, weights):
+        """
+        Sort all vertex group assignments by group (compressed sparse row layout), the assignments
+        are three flat arrays with one entry per assignment: vertex number, group index and weight.
+
+        groupVertices[groupStart[g]:groupStart[g+1]] are the vertices of group g, groupWeights the corresponding weights
+        """
+        numGroups = max(self.vertexGroupNames.keys()) + 1
+        valid = np.isin(groups, list(self.vertexGroupNames.keys()))
+        for groupIndex in np.unique(groups[~valid]).tolist():
+            print("Vertex says it has group with index " + str(groupIndex) + ", but that group does not exist. Will ignore this vertex group assignment.")
+
+        (self.groupStart, self.groupVertices) = _csr(groups[valid], verts[valid], numGroups)
+        (self.groupStart, self.groupWeights) = _csr(groups[valid], weights[valid], numGroups)
+        self._sliceGroups()
+
+    def setPolygons(self, polyLoopTotal, polyVertices):
+        """
+        Supply the polygons as flat arrays and an index of all polygons connected to a vertex
+        (needed for efficiency, bestFace search), both in compressed sparse row layout.
+        polyLoopTotal is the number of vertices per polygon, polyVertices all vertices in polygon order.
+
+        polyVertices[polyStart[p]:polyStart[p+1]] are the vertices of polygon p
+        vertPolyIndex[vertPolyStart[v]:vertPolyStart[v+1]] are the polygons using vertex v
+        """
+        vertexCount = len(self.allVertexCoordinates)
+        polygonCount = len(polyLoopTotal)
+
+        self.polyLoopTotal = polyLoopTotal
+        self.polyVertices = polyVertices
+        self.polyStart = np.zeros(polygonCount + 1, dtype=np.int64)
+        np.cumsum(polyLoopTotal, out=self.polyStart[1:])
+
+        # polygons per vertex, ascending polygon numbers
+        #
+        self.loopPolygons = np.repeat(np.arange(polygonCount, dtype=np.int32), polyLoopTotal)
+        (self.vertPolyStart, self.vertPolyIndex) = _csr(polyVertices, self.loopPolygons, vertexCount)
+
+        # median points of all faces
+        #
+        if polygonCount > 0:
+            self.faceCentroids = np.add.reduceat(self.allVertexCoordinates[polyVertices], self.polyStart[:-1], axis=0) / polyLoopTotal[:, None]
+        else:
+            self.faceCentroids = np.zeros((0, 3))
+
+    def setEdges(self, edgeVertices):
+        """
+        generates special indices to speed up searches, edgeVertices is the (E,2) array of all edges
+
+        vertEdgeIndex[vertEdgeStart[v]:vertEdgeStart[v+1]] are all edges connected to vertex v
+        """
+        vertexCount = len(self.allVertexCoordinates)
+        edgeCount = len(edgeVertices)
+        self.edgeVertices = edgeVertices
+
+        # supply an index of all edges connected to a vertex
+        #
+        edgeNumbers = np.repeat(np.arange(edgeCount, dtype=np.int32), 2)
+        (self.vertEdgeStart, self.vertEdgeIndex) = _csr(edgeVertices.ravel(), edgeNumbers, vertexCount)
+
+        # in case we need that (we need for a high number of vertices in MakeHuman
+        #
+        self.max_poles = int(np.diff(self.vertEdgeStart).max()) if vertexCount > 0 else 0
+
+    def vertexPolygons(self, vertex):
+        """
+        numbers of the polygons connected to a vertex
+        """
+        return self.vertPolyIndex[self.vertPolyStart[vertex]:self.vertPolyStart[vertex + 1]].tolist()
+
+    def polygonVertices(self, polygon):
+        """
+        vertex numbers of a polygon
+        """
+        return self.polyVertices[self.polyStart[polygon]:self.polyStart[polygon + 1]].tolist()
+
+    def vertexGroupNameToIndex(self, vertexGroupName):
+        for idx in self.vertexGroupNames.keys():
+            if self.vertexGroupNames[idx] == vertexGroupName:
+                return idx
+        print("Could not find vertex group " + vertexGroupName + " in this mesh. Available names are:")
+        print(self.vertexGroupNames)
+        return None
+
+    def vertexGroupKDTree(self, vertexGroupName):
+        """
+        returns number of vertices of the group and a search tree (VertexGroupTree),
+        for a group with three vertices the vertex numbers are returned instead of the tree
+        the result is kept for the next call
+        """
+        if vertexGroupName in self._groupTrees:
+            return self._groupTrees[vertexGroupName]
+
+        result = (0, None)
+
+        #
+        # first find the group, the vertices are a slice of the sorted assignments
+        #
+        for groupIndex in self.vertexGroupNames.keys():
+            if self.vertexGroupNames[groupIndex] == vertexGroupName:
+                indices = self.vertexGroupVertices[groupIndex]
+                size = len(indices)
+
+                if size < 3:
+                    result = (size, None)
+                #
+                # in case of a rigid group
+                #
+                elif size == 3:
+                    result = (size, indices.astype(np.int64))
+
+                # in case we have elements create the search tree
+                #
+                else:
+                    result = (size, VertexGroupTree(self.allVertexCoordinates[indices], indices))
+                break
+
+        self._groupTrees[vertexGroupName] = result
+        return result
+
+    def triangles(self):
+        """
+        all polygons split into triangles (fan from the first vertex), returns (T,3) vertex numbers
+        """
+        count = np.maximum(self.polyLoopTotal - 2, 0)
+        polygons = np.repeat(np.arange(len(count)), count)
+        corner = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count) + 1
+        first = self.polyStart[polygons]
+        return np.column_stack((self.polyVertices[first], self.polyVertices[first + corner], self.polyVertices[first + corner + 1]))
+
+    def vertexGroupTriangles(self, vertexGroupName):
+        """
+        returns the triangles (T,3) with all vertices in the group, a search tree of their centroids and the
+        maximum distance of a triangle vertex to its centroid, the result is kept for the next call
+        """
+        if vertexGroupName in self._groupTriangles:
+            return self._groupTriangles[vertexGroupName]
+
+        result = (np.zeros((0, 3), dtype=np.int64), None, 0.0)
+        groupIndex = self.vertexGroupNameToIndex(vertexGroupName)
+        if groupIndex is not None:
+            inGroup = np.zeros(len(self.allVertexCoordinates), dtype=bool)
+            inGroup[self.vertexGroupVertices[groupIndex]] = True
+            triangles = self.triangles()
+            triangles = triangles[inGroup[triangles].all(axis=1)]
+            if len(triangles) > 0:
+                corners = self.allVertexCoordinates[triangles]
+                centroids = corners.mean(axis=1)
+                radius = float(np.sqrt(((corners - centroids[:, None, :]) ** 2).sum(axis=2)).max())
+                result = (triangles, VertexGroupTree(centroids, np.arange(len(triangles))), radius)
+
+        self._groupTriangles[vertexGroupName] = result
+        return result
+
+    def vertexNeighbors(self, vertex):
+        """
+        vertex numbers at the other end of all edges connected to a vertex
+        """
+        edges = self.edgeVertices[self.vertEdgeIndex[self.vertEdgeStart[vertex]:self.vertEdgeStart[vertex + 1]]]
+        return np.where(edges[:, 0] != vertex, edges[:, 0], edges[:, 1]).tolist()
+
+def meshFromArrays(coords, polyLoopTotal, polyVertices, vertexGroupNames, membership, edges=True):
+    """
+    create a MeshArrays object without blender
+
+    coords: (V,3) vertex coordinates, they are copied, so the mesh can be changed without changing coords
+    polyLoopTotal, polyVertices: number of vertices per polygon and all vertices in polygon order
+    vertexGroupNames: dict group index -> name
+    membership: (verts, groups, weights) flat arrays with one entry per vertex group assignment
+    edges: the edges are derived from the polygons (needed for clothes)
+    """
+    mesh = MeshArrays()
+    mesh.allVertexCoordinates = np.array(coords, dtype=np.float64, copy=True).reshape(-1, 3)
+    mesh.vertexGroupNames = dict(vertexGroupNames)
+
+    (verts, groups, weights) = membership
+    mesh.setGroups(np.asarray(verts, dtype=np.int32), np.asarray(groups, dtype=np.int32), np.asarray(weights, dtype=np.float32))
+
+    polyLoopTotal = np.asarray(polyLoopTotal, dtype=np.int32)
+    polyVertices = np.asarray(polyVertices, dtype=np.int32)
+    mesh.setPolygons(polyLoopTotal, polyVertices)
+
+    if edges:
+        # each vertex of a polygon forms an edge with the next one
+        #
+        following = np.arange(len(polyVertices)) + 1
+        last = mesh.polyStart[1:] - 1
+        following[last] = mesh.polyStart[:-1]
+        pairs = np.sort(np.column_stack((polyVertices, polyVertices[following])), axis=1)
+        mesh.setEdges(np.unique(pairs, axis=0).astype(np.int32))
+    return mesh
+
+class VertexMatchTable():
+
+    def __init__(self, numVertices):
+        """
+        column based table of all matches, one row per clothes vertex
+
+        indices: (N,3) human vertex numbers of the triangle used for a vertex
+        weights: (N,3) weights of these vertices
+        offsets: (N,3) offset of the clothes vertex to the weighted point
+        exact:   human vertex number in case of an exact match, -1 otherwise
+        """
+        self.indices = np.full((numVertices, 3), -1, dtype=np.int32)
+        self.weights = np.zeros((numVertices, 3), dtype=np.float64)
+        self.offsets = np.zeros((numVertices, 3), dtype=np.float64)
+        self.exact = np.full(numVertices, -1, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def nonExact(self, rows=None):
+        """
+        row numbers (clothes vertex numbers) of all vertices without exact match, optionally only those of rows
+        """
+        if rows is None:
+            return np.flatnonzero(self.exact < 0)
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows[self.exact[rows] < 0]
+
+    def reset(self, rows):
+        """
+        clear the rows before they are calculated again
+        """
+        self.indices[rows] = -1
+        self.weights[rows] = 0.0
+        self.offsets[rows] = 0.0
+        self.exact[rows] = -1
+
+    def formatLines(self, start, stop):
+        """
+        lines of the verts section of the mhclo file for the vertices start to stop-1,
+        exact matches only contain the human vertex number, all others 9 values
+        """
+        exact = self.exact[start:stop] >= 0
+
+        # write distances dx, dy, dz according to makehuman order
+        #
+        offsets = self.offsets[start:stop]
+        values = np.column_stack((self.indices[start:stop], self.weights[start:stop], offsets[:, 0], offsets[:, 2], -offsets[:, 1]))
+        values[exact, 0] = self.exact[start:stop][exact]
+
+        # all values of a non-exact row are used, only the first one of an exact row
+        #
+        used = np.ones(values.shape, dtype=bool)
+        used[exact, 1:] = False
+
+        fmt = np.where(exact, "%d\n", "%d %d %d %.4f %.4f %.4f %.4f %.4f %.4f\n")
+        return "".join(fmt.tolist()) % tuple(values[used].tolist())
+
+def _barycentricFit(humanCoords, indices, points):
+    """
+    calculate weights and offsets for many clothes vertices at once
+
+    humanCoords is the (V,3) array of all human vertex coordinates, indices the (N,3) array of
+    the triangles ABC (human vertex numbers) and points the (N,3) array of clothes vertices Q.
+    returns weights (N,3) for A, B, C and the offsets (N,3) of Q to the weighted point.
+    """
+    A = humanCoords[indices[:, 0]]
+    B = humanCoords[indices[:, 1]]
+    C = humanCoords[indices[:, 2]]
+    Q = points
+
+    # To make the algorithm understandable the 3 vertices are the triangle ABC, all vectors use capital letters
+    # the normal of the triangle is the same blender calculates with mathutils.geometry.normal
+    #
+    N = np.cross(A - B, B - C)
+    _normalize(N)
+
+    # transform normal vector to corner of triangle and recalculate length
+    # new vector is R (direction is the same)
+    #
+    QA = Q - A
+    R = Q - N * _dot(QA, N)[:, None]
+
+    # now weight the triangle multiplied with the normal
+    #
+    BA = B - A
+    _normalize(BA)
+    NBA = np.cross(N, BA)
+    _normalize(NBA)
+
+    AC = A - C
+    BC = B - C
+    RC = R - C
+
+    # we are using barycentric coordinates to determine the weights. Normally you have
+    # to do a projection. To get the values of all dimensions we can use the scalar or dot.product
+    # of our vectors. This is also called projection product ...
+    # the barycentric calculation now could be rewritten as
+    #
+    # WeightA = ( BC.NBA * RC.BA - BC.BA * RC.NBA) / (BA.AC * BC.NBA - BC.AC * AC.NBA)
+    # WeightB = (-AC.NBA * RC.BA + AC.BA * RC.NBA) / (BA.AC * BC.NBA - BC.AC * AC.NBA)
+    #
+    # WeightC = 1 - WeightA - WeightB
+    #
+    a00 = _dot(AC, BA)
+    a01 = _dot(BC, BA)
+    a10 = _dot(AC, NBA)
+    a11 = _dot(BC, NBA)
+    b0 = _dot(RC, BA)
+    b1 = _dot(RC, NBA)
+
+    det = a00*a11 - a01*a10
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wa = (a11*b0 - a01*b1)/det
+        wb = (-a10*b0 + a00*b1)/det
+    wc = 1 - wa - wb
+
+    # calculate the distance with the weighted vectors and subtract that result from our point Q
+    #
+    D = Q - (wa[:, None] * A + wb[:, None] * B + wc[:, None] * C)
+
+    return (np.stack((wa, wb, wc), axis=1), D)
+
+def _dot(U, V):
+    return np.einsum('ij,ij->i', U, V)
+
+def _normalize(V):
+    # normalize rows in place, zero vectors stay zero like in mathutils
+    #
+    length = np.sqrt(_dot(V, V))
+    nonzero = length > 0.0
+    V[nonzero] /= length[nonzero, None]
+
+def findClosestVertices(human, clothes, table, rows=None):
+    """
+    find the closest 3 human vertices (or an exact match) for all clothes vertices, group by group,
+    rows can restrict the search to these clothes vertices
+
+    returns (success, error text, isTriangle), isTriangle is set when the (last) group is a rigid group of 3 vertices
+    """
+    vm = table
+    isTriangle = False
+    for vgroupIdx in clothes.vertexGroupNames.keys():
+        vgroupName = clothes.vertexGroupNames[vgroupIdx]
+        clothesVertices = clothes.vertexGroupVertices[vgroupIdx]
+        isTriangle = False
+
+        # skip empty groups on clothes
+        #
+        if len(clothesVertices) == 0:
+            continue
+
+        # determine kd tree, also delivers number of vertices per group
+        # 3 means triangle group, then an array is given
+        #
+        (size, kdtree) = human.vertexGroupKDTree(vgroupName) 
+        if size < 3:    # group with less than 3 vertices does not work
+            return (False, "Cannot create search tree for group " + vgroupName + " on human. Number of vertices must be at least 3.", False)
+
+        clothesIndices = clothesVertices.astype(np.int64)
+        if rows is not None:
+            clothesIndices = clothesIndices[np.isin(clothesIndices, rows)]
+
+        #
+        # special code for rigid group
+        #
+        if size == 3:
+            #
+            # first test for a degenerated triangle (like 3 verts forming a line)
+            #
+            (A, B, C) = human.allVertexCoordinates[kdtree]
+            area = 0.5 * np.linalg.norm(np.cross(B - A, C - A))
+            if area < 0.0001:
+                return (False, "Group " + vgroupName + ": The vertices create a triangle smaller than 0.0001, this will result in bad geometry", False)
+
+            # mark it a triangle to avoid further calculations
+            #
+            isTriangle = True
+
+            vm.indices[clothesIndices] = kdtree     # an array in this case
+            continue
+
+        if len(clothesIndices) == 0:
+            continue
+
+        # Find the closest 3 vertices for all vertices of the group in one query, we consider 0.0001 as an exact match
+        #
+        points = clothes.allVertexCoordinates[clothesIndices]
+        (indices, distances) = kdtree.query(points, 3)
+        exact = distances[:, 0] < 0.0001
+
+        vm.exact[clothesIndices[exact]] = indices[exact, 0]
+        vm.indices[clothesIndices[~exact]] = indices[~exact]
+    return (True, "", isTriangle)
+
+def findBestFaces(human, clothes, table, rows=None):
+    # In this method we will go through the vertexmatches and if needed switch which vertices are selected so that all
+    # vertices belong to the same face. The rows are evaluated in chunks, all faces of a chunk at once.
+    vm = table
+    rows = vm.nonExact(rows)
+    for start in range(0, len(rows), _FACE_CHUNK):
+        _bestFaces(human, clothes.allVertexCoordinates, vm, rows[start:start + _FACE_CHUNK])
+
+def _bestFaces(human, clothesCoords, vm, rows):
+    closest = vm.indices[rows].astype(np.int64)
+
+    # collect all faces of the 3 closest vertices (entries), in the order the vertices and their faces appear
+    #
+    vertices = closest.ravel()
+    counts = human.vertPolyStart[vertices + 1] - human.vertPolyStart[vertices]
+    total = int(counts.sum())
+    if total == 0:
+        return
+    entryRow = np.repeat(np.repeat(np.arange(len(rows)), 3), counts)
+    entryFace = human.vertPolyIndex[np.repeat(human.vertPolyStart[vertices] - (np.cumsum(counts) - counts), counts) + np.arange(total)]
+
+    # a face found for more than one of our verts is more important, the score is the number of these verts
+    # a face found for all three means the vertices already form a polygon, then no change is needed, this avoids
+    # that we take different vertices from this polygon later in case of quad
+    #
+    order = np.lexsort((np.arange(total), entryFace, entryRow))
+    first = np.ones(total, dtype=bool)
+    first[1:] = (entryRow[order][1:] != entryRow[order][:-1]) | (entryFace[order][1:] != entryFace[order][:-1])
+    groupStart = np.flatnonzero(first)
+    score = np.diff(np.append(groupStart, total))
+    groupRow = entryRow[order][groupStart]
+    groupFace = entryFace[order][groupStart]
+    appearance = order[groupStart]          # first appearance of the face for this row
+
+    maxScore = np.zeros(len(rows), dtype=np.int64)
+    np.maximum.at(maxScore, groupRow, score)
+
+    # now figure out the best faces, all in case of maxScore = 1 otherwise those with maxscore,
+    # then the face with lowest distance of its median point, the first one in case of equal distances
+    #
+    best = (score == maxScore[groupRow]) & (maxScore[groupRow] < 3)
+    (groupRow, groupFace, appearance) = (groupRow[best], groupFace[best], appearance[best])
+    distance = np.sqrt(np.sum((human.faceCentroids[groupFace] - clothesCoords[rows[groupRow]]) ** 2, axis=1))
+    order = np.lexsort((appearance, distance, groupRow))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = groupRow[order][1:] != groupRow[order][:-1]
+    chosen = order[first]
+
+    # We should now ideally pick those verts in the face which are the
+    # closest to the clothes vert. But for the sake of efficiency we
+    # will instead pick the first three verts listed in the face
+    #
+    faceStart = human.polyStart[groupFace[chosen]]
+    vm.indices[rows[groupRow[chosen]]] = human.polyVertices[faceStart[:, None] + np.arange(3)]
+
+def findExactNeighbors(human, clothes, table, rows=None):
+    symverts = [None, None]
+    vm = table
+
+    #
+    # only  consider faces not bound to a single vertex
+    #
+    for n in vm.nonExact(rows).tolist():
+
+        # edge neighbors
+        # check number of exact neighbors, we need two for using the edge
+        #
+        exact = 0
+        for res_id in clothes.vertexNeighbors(n):
+            if exact == 2:
+                break
+            if vm.exact[res_id] >= 0:
+                symverts[exact] = int(vm.exact[res_id])
+                exact += 1
+
+        # now we need to find the polygon
+        #
+        if exact == 2:
+            # find the polygon with this edge
+            for polygon in human.vertexPolygons(symverts[0]):
+                polygonVertices = human.polygonVertices(polygon)
+                if symverts[1] in polygonVertices:
+                    #
+                    # okay this is the polygon, we need a third vertex
+                    #
+                    for v in polygonVertices:
+                        if v not in symverts:
+                            #
+                            # v is the last one ... we are complete
+                            vm.indices[n] = (symverts[0], symverts[1], v)
+                            break
+                    break
+
+def _closestPointOnTriangles(P, A, B, C):
+    """
+    closest points of the points P on the triangles ABC (all arrays (N,3)), the regions of the triangle
+    (corners, edges, inside) are tested like in "Real-Time Collision Detection" by Christer Ericson
+    """
+    AB = B - A
+    AC = C - A
+    AP = P - A
+    d1 = _dot(AB, AP)
+    d2 = _dot(AC, AP)
+    BP = P - B
+    d3 = _dot(AB, BP)
+    d4 = _dot(AC, BP)
+    CP = P - C
+    d5 = _dot(AB, CP)
+    d6 = _dot(AC, CP)
+
+    va = d3*d6 - d5*d4
+    vb = d5*d2 - d1*d6
+    vc = d1*d4 - d3*d2
+
+    # inside the triangle as default, the regions are then checked from the last to the first
+    #
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = 1.0 / (va + vb + vc)
+        v = vb * denom
+        w = vc * denom
+        result = A + AB * v[:, None] + AC * w[:, None]
+
+        # edge BC
+        #
+        region = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        result[region] = (B + (C - B) * w[:, None])[region]
+
+        # edge AC
+        #
+        region = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        w = d2 / (d2 - d6)
+        result[region] = (A + AC * w[:, None])[region]
+
+        # edge AB
+        #
+        region = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        v = d1 / (d1 - d3)
+        result[region] = (A + AB * v[:, None])[region]
+
+    # corners
+    #
+    region = (d6 >= 0) & (d5 <= d6)
+    result[region] = C[region]
+    region = (d3 >= 0) & (d4 <= d3)
+    result[region] = B[region]
+    region = (d1 <= 0) & (d2 <= 0)
+    result[region] = A[region]
+    return result
+
+def _closestTriangles(humanCoords, triangles, tree, radius, points):
+    """
+    number of the closest triangle for each point
+
+    the triangles with the closest centroids are tested first, the result is certain when the next
+    centroid minus the radius of the biggest triangle is further away, otherwise the number of candidates is doubled
+    """
+    best = np.zeros(len(points), dtype=np.int64)
+    rows = np.arange(len(points))
+    n = min(_TRIANGLE_CANDIDATES, len(triangles))
+    while len(rows) > 0:
+        (candidates, centroidDistances) = tree.query(points[rows], n)
+        corners = humanCoords[triangles[candidates.ravel()]]
+        repeated = np.repeat(points[rows], n, axis=0)
+        closest = _closestPointOnTriangles(repeated, corners[:, 0], corners[:, 1], corners[:, 2])
+        distances = np.sqrt(((closest - repeated) ** 2).sum(axis=1)).reshape(-1, n)
+        nearest = np.argmin(distances, axis=1)
+        best[rows] = candidates[np.arange(len(rows)), nearest]
+
+        if n == len(triangles):
+            break
+        certain = centroidDistances[:, -1] - radius >= distances[np.arange(len(rows)), nearest]
+        rows = rows[~certain]
+        n = min(n * 2, len(triangles))
+    return best
+
+def findClosestTriangles(human, clothes, table, rows=None):
+    """
+    fitting mode "SURFACE": find the closest triangle on the human surface for all clothes vertices, group by group
+    vertices on a human vertex (0.0001) are still exact matches, rows can restrict the search to these clothes vertices
+
+    returns (success, error text, isTriangle) like findClosestVertices
+    """
+    vm = table
+    isTriangle = False
+    for vgroupIdx in clothes.vertexGroupNames.keys():
+        vgroupName = clothes.vertexGroupNames[vgroupIdx]
+        clothesVertices = clothes.vertexGroupVertices[vgroupIdx]
+        isTriangle = False
+
+        # skip empty groups on clothes
+        #
+        if len(clothesVertices) == 0:
+            continue
+
+        (size, kdtree) = human.vertexGroupKDTree(vgroupName)
+        if size < 3:    # group with less than 3 vertices does not work
+            return (False, "Cannot create search tree for group " + vgroupName + " on human. Number of vertices must be at least 3.", False)
+
+        clothesIndices = clothesVertices.astype(np.int64)
+        if rows is not None:
+            clothesIndices = clothesIndices[np.isin(clothesIndices, rows)]
+
+        # rigid group, same as for closest vertices
+        #
+        if size == 3:
+            (A, B, C) = human.allVertexCoordinates[kdtree]
+            area = 0.5 * np.linalg.norm(np.cross(B - A, C - A))
+            if area < 0.0001:
+                return (False, "Group " + vgroupName + ": The vertices create a triangle smaller than 0.0001, this will result in bad geometry", False)
+            isTriangle = True
+            vm.indices[clothesIndices] = kdtree
+            continue
+
+        if len(clothesIndices) == 0:
+            continue
+
+        (triangles, tree, radius) = human.vertexGroupTriangles(vgroupName)
+        if tree is None:
+            return (False, "Group " + vgroupName + " on human does not contain complete faces, it cannot be used for fitting mode surface.", False)
+
+        points = clothes.allVertexCoordinates[clothesIndices]
+        (indices, distances) = kdtree.query(points, 1)
+        exact = distances[:, 0] < 0.0001
+        vm.exact[clothesIndices[exact]] = indices[exact, 0]
+
+        best = _closestTriangles(human.allVertexCoordinates, triangles, tree, radius, points[~exact])
+        vm.indices[clothesIndices[~exact]] = triangles[best]
+    return (True, "", isTriangle)
+
+def findWeightsAndDistances(human, clothes, table, scales=(1.0, 1.0, 1.0), rows=None):
+    # calculate all non-exact matches in one pass, exact ones keep weights and offsets of zero
+    #
+    vm = table
+    rows = vm.nonExact(rows)
+
+    if len(rows) == 0:
+        return
+
+    (weights, distances) = _barycentricFit(human.allVertexCoordinates, vm.indices[rows], clothes.allVertexCoordinates[rows])
+    vm.weights[rows] = weights
+    vm.offsets[rows] = distances * np.asarray(scales, dtype=np.float64)
+
+
+def fitClothes(human, clothes, scales=(1.0, 1.0, 1.0), mode="VERTEX", table=None, rows=None):
+    """
+    run the complete fitting for one piece of clothes, mode is "VERTEX" (closest vertices) or "SURFACE"
+    to refit only some vertices a table of a former result and the rows to calculate again can be supplied
+
+    returns (success, error text, VertexMatchTable, isTriangle)
+    """
+    if table is None:
+        table = VertexMatchTable(len(clothes.allVertexCoordinates))
+    if rows is not None:
+        table.reset(rows)
+
+    if mode == "SURFACE":
+        (b, text, isTriangle) = findClosestTriangles(human, clothes, table, rows)
+    else:
+        (b, text, isTriangle) = findClosestVertices(human, clothes, table, rows)
+    if b is False:
+        return (False, text, table, isTriangle)
+
+    # in case of a mesh with only three vertices to follow or surface mode, no additional work
+    #
+    if isTriangle is False and mode != "SURFACE":
+        findBestFaces(human, clothes, table, rows)
+        findExactNeighbors(human, clothes, table, rows)
+
+    findWeightsAndDistances(human, clothes, table, scales, rows)
+    return (True, "", table, isTriangle)
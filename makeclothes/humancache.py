@@ -0,0 +1,64 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# cache for the human side of MakeClothes
+#
+# the structures of the human (polygon index, face median points, search trees per group) do not depend on the clothes,
+# so they are kept between exports. An entry is found by the mesh type and a hash of vertex coordinates, polygons,
+# vertex group names and group assignments. Whenever one of these changes, the key changes as well, so an outdated
+# entry is never used. Only the last recently used _HUMAN_CACHE_SIZE entries are kept.
+#
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from .mhmesh import MHMesh, vertexGroupMembership, rangeMembership
+
+_HUMAN_CACHE_SIZE = 4
+
+_humanCache = OrderedDict()
+
+def humanMeshKey(humanObj, membership):
+    mesh = humanObj.data
+    meshtype = humanObj.MhMeshType if hasattr(humanObj, "MhMeshType") else "hm08"
+
+    coords = np.zeros(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    loopTotal = np.zeros(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loopTotal)
+    loopVertices = np.zeros(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loopVertices)
+
+    h = hashlib.sha1()
+    for arr in (coords, loopTotal, loopVertices) + membership:
+        h.update(arr.tobytes())
+    for group in humanObj.vertex_groups:
+        h.update((str(group.index) + ":" + group.name + "\n").encode("utf-8"))
+    return (meshtype, h.hexdigest())
+
+def getHumanMesh(humanObj, meshConfig=None):
+    """
+    return the MHMesh for the human, either from cache or a new one
+
+    if meshConfig is given and its "groups_by_range" table fits to the human, the group membership
+    is taken from the table instead of reading all vertices
+    """
+    membership = rangeMembership(humanObj, meshConfig)
+    if membership is None:
+        membership = vertexGroupMembership(humanObj.data)
+    key = humanMeshKey(humanObj, membership)
+    if key in _humanCache:
+        _humanCache.move_to_end(key)
+        humanmesh = _humanCache[key]
+        humanmesh.rebind(humanObj)
+        return humanmesh
+
+    humanmesh = MHMesh(humanObj, membership=membership)
+    _humanCache[key] = humanmesh
+    while len(_humanCache) > _HUMAN_CACHE_SIZE:
+        _humanCache.popitem(last=False)
+    return humanmesh
+
+def clearHumanCache():
+    _humanCache.clear()
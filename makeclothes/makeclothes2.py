@@ -50,8 +50,20 @@ class MHC_PT_MakeClothesPanel(bpy.types.Panel):
         row = col.row()
         row.prop(scn, 'MHAllowMods', text="Allow modifiers")
         row = col.row()
+        row.label(text="Fitting")
+        row.prop(scn, 'MHFittingMode', text="")
+        row = col.row()
+        row.prop(scn, 'MHIncremental', text="Incremental export")
+        row = col.row()
+        row.prop(scn, 'MHUseGroupRanges', text="Use group ranges")
+        row = col.row()
         row.prop(scn, 'MHDebugFile', text="Save additional debug file")
         row = col.row()
+        row.prop(scn, 'MHProfile', text="Profile export")
+        if scn.MHProfile:
+            row = col.row()
+            row.prop(scn, 'MHProfileMemory', text="Profile memory")
+        row = col.row()
         row.label(text="License")
         row.prop(scn, 'MhClothesLicense', text="")
         row = col.row()
@@ -0,0 +1,187 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# reader for .mhclo files, does not need blender (only numpy), so it can be used and tested standalone
+#
+# the verts section is returned as arrays:
+#
+# indices: (N,3) human vertex numbers, for an exact match all three are the same vertex
+# weights: (N,3) weights, (1,0,0) for an exact match
+# offsets: (N,3) offsets, already converted to blender order (dx, -dz, dy)
+#
+# delverts contains all vertex numbers of the delete_verts section, ranges "a - b" are expanded
+#
+
+import os
+import numpy as np
+
+class MhcloData:
+
+    def __init__(self):
+        self.obj_file = None
+        self.material = None
+        self.xs = None
+        self.ys = None
+        self.zs = None
+        self.author = "unknown"
+        self.license = "CC0"
+        self.name = "imported_cloth"
+        self.description = "no description"
+        self.tags = ""
+        self.zdepth = 50
+        self.first = 0
+        self.indices = np.zeros((0, 3), dtype=np.int64)
+        self.weights = np.zeros((0, 3), dtype=np.float64)
+        self.offsets = np.zeros((0, 3), dtype=np.float64)
+        self.delverts = np.zeros(0, dtype=np.int64)
+        self.delete = False
+
+def _parseVerts(lines, counts):
+    """
+    convert all lines of the verts section at once, counts contains the number of words per line
+    """
+    numVerts = len(lines)
+    indices = np.zeros((numVerts, 3), dtype=np.int64)
+    weights = np.zeros((numVerts, 3), dtype=np.float64)
+    offsets = np.zeros((numVerts, 3), dtype=np.float64)
+    if numVerts == 0:
+        return (indices, weights, offsets)
+
+    # a line has either one vertex (exact match) or at least 9 values, everything else
+    # would take the missing values from the next line
+    #
+    counts = np.array(counts, dtype=np.int64)
+    wrong = np.flatnonzero((counts != 1) & (counts < 9))
+    if len(wrong) > 0:
+        raise ValueError("verts line " + str(int(wrong[0])) + " has " + str(int(counts[wrong[0]])) + " values, 1 or 9 are expected")
+
+    values = np.array(" ".join(lines).split(), dtype=np.float64)
+    start = np.cumsum(counts) - counts
+    exact = counts == 1
+    full = ~exact
+
+    # exact match: one vertex with weight 1
+    #
+    indices[exact] = values[start[exact]].astype(np.int64)[:, None]
+    weights[exact, 0] = 1.0
+
+    columns = start[full][:, None] + np.arange(9)
+    rows = values[columns]
+    indices[full] = rows[:, 0:3].astype(np.int64)
+    weights[full] = rows[:, 3:6]
+    offsets[full] = np.column_stack((rows[:, 6], -rows[:, 8], rows[:, 7]))
+    return (indices, weights, offsets)
+
+def _parseDeleteVerts(words):
+    """
+    expand the numbers of the delete_verts section, "a - b" means all numbers from a to b
+    """
+    tokens = np.array(words, dtype=str)
+    if len(tokens) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    dash = tokens == "-"
+    values = np.zeros(len(tokens), dtype=np.int64)
+    values[~dash] = tokens[~dash].astype(np.int64)
+
+    # a dash combines the number before and the number behind to a range,
+    # all numbers not next to a dash are single values
+    #
+    dashes = np.flatnonzero(dash)
+    dashes = dashes[(dashes > 0) & (dashes < len(tokens) - 1)]
+    nextToDash = np.zeros(len(tokens), dtype=bool)
+    nextToDash[dashes - 1] = True
+    nextToDash[dashes + 1] = True
+    single = values[~dash & ~nextToDash]
+
+    lower = values[dashes - 1]
+    upper = values[dashes + 1]
+    lengths = np.maximum(upper - lower + 1, 0)
+    offsets = np.cumsum(lengths) - lengths
+    ranges = np.repeat(lower - offsets, lengths) + np.arange(lengths.sum())
+
+    return np.unique(np.concatenate((single, ranges)))
+
+def readMhclo(filename):
+    """
+    read a .mhclo file, returns MhcloData, IOError is raised if the file cannot be read,
+    ValueError if the verts section is malformed
+    """
+    folder = os.path.dirname(os.path.realpath(os.path.expanduser(filename)))
+
+    with open(filename, "r") as fp:
+        text = fp.read()
+
+    data = MhcloData()
+    status = ""
+    vertLines = []
+    vertCounts = []
+    deleteWords = []
+
+    for line in text.splitlines():
+        words = line.split()
+        l = len(words)
+
+        if l == 0:
+            status = ""
+            continue
+
+        # at least grab what you get from the comment
+        #
+        if words[0] == '#':
+            if l > 2:
+                key = words[1].lower()
+                if "author" in key:
+                    data.author = words[2]
+                elif "license" in key:
+                    if "by" in line.lower():
+                        data.license = "CC-BY"
+                    elif "apgl" in line.lower():
+                        data.license = "AGPL"
+                elif "description" in key:
+                    data.description = " ".join(words[2:])
+            continue
+
+        # collect lines of the sections, they are converted later
+        #
+        if status != "":
+            if words[0].isnumeric():
+                if status == "v":
+                    vertLines.append(line)
+                    vertCounts.append(l)
+                else:
+                    deleteWords.extend(words)
+                continue
+            status = ""
+
+        key = words[0]
+        if key == 'material':
+            data.material = os.path.join(folder, words[1])
+        elif key == 'obj_file':
+            data.obj_file = os.path.join(folder, words[1])
+        elif key == 'verts':
+            if len(words) > 1:
+                data.first = int(words[1])      # this value will be ignored, we always start from zero
+                status = "v"
+        elif key == 'x_scale':
+            data.xs = (int(words[1]), int(words[2]), float(words[3]))
+        elif key == 'y_scale':
+            data.ys = (int(words[1]), int(words[2]), float(words[3]))
+        elif key == 'z_scale':
+            data.zs = (int(words[1]), int(words[2]), float(words[3]))
+        elif key == 'name':
+            data.name = words[1]
+        elif key == 'z_depth':
+            data.zdepth = int(words[1])
+        elif key == 'tag':
+            if data.tags != "":
+                data.tags += ","
+            data.tags += words[1].lower()
+        elif key == 'delete_verts':
+            data.delete = True
+            status = 'd'
+
+    (data.indices, data.weights, data.offsets) = _parseVerts(vertLines, vertCounts)
+    data.delverts = _parseDeleteVerts(deleteWords)
+    return data
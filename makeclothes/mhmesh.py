@@ -2,43 +2,188 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
-import mathutils
+from .fitting import MeshArrays, _csr
+
+def vertexGroupMembership(mesh, skip=None):
+    """
+    Collect all vertex group assignments of a mesh in one pass.
+
+    Returns three flat arrays with one entry per assignment: vertex number, group index and weight.
+    Assignments to the group indices in skip are left out.
+    """
+    skip = set() if skip is None else set(skip)
+    verts = []
+    groups = []
+    weights = []
+    for vertex in mesh.vertices:
+        index = vertex.index
+        for group in vertex.groups:
+            if group.group in skip:
+                continue
+            verts.append(index)
+            groups.append(group.group)
+            weights.append(group.weight)
+    return (np.array(verts, dtype=np.int32), np.array(groups, dtype=np.int32), np.array(weights, dtype=np.float32))
+
+def rangeMembership(obj, meshConfig):
+    """
+    Group membership using the "groups_by_range" table of the mesh configuration (all weights are 1.0),
+    same format as vertexGroupMembership.
+
+    The table is only used when the number of vertices ("vertices" in the configuration) is identical and
+    all groups of the table exist, otherwise None is returned. The groups of the table are taken from the
+    ranges, additional groups of the object (e.g. HelperGeometry, joints or a delete group) are read from
+    the vertices.
+    """
+    if not meshConfig or "groups_by_range" not in meshConfig or "vertices" not in meshConfig:
+        return None
+    if len(obj.data.vertices) != meshConfig["vertices"]:
+        return None
 
-class MHMesh:
+    ranges = meshConfig["groups_by_range"]
+    if not set(ranges.keys()) <= set([group.name for group in obj.vertex_groups]):
+        return None
 
-    def __init__(self, obj, context=None, allow_modifiers=False):
+    verts = []
+    groups = []
+    weights = []
+    ranged = []
+    for group in obj.vertex_groups:
+        if group.name in ranges:
+            (first, last) = ranges[group.name]
+            verts.append(np.arange(first, last + 1, dtype=np.int32))
+            groups.append(np.full(last + 1 - first, group.index, dtype=np.int32))
+            weights.append(np.ones(last + 1 - first, dtype=np.float32))
+            ranged.append(group.index)
+
+    if len(ranged) < len(obj.vertex_groups):
+        (otherVerts, otherGroups, otherWeights) = vertexGroupMembership(obj.data, skip=ranged)
+        verts.append(otherVerts)
+        groups.append(otherGroups)
+        weights.append(otherWeights)
+
+    verts = np.concatenate(verts)
+    groups = np.concatenate(groups)
+    weights = np.concatenate(weights)
+
+    # same order as a scan: by vertex
+    #
+    order = np.argsort(verts, kind='stable')
+    return (verts[order], groups[order], weights[order])
+
+def verifyRangeMembership(obj, membership, rangeMembership, meshConfig):
+    """
+    compare the real group membership of the groups in the ranges of meshConfig with the one from the ranges,
+    returns (success, names of the groups which differ)
+    """
+    (verts, groups, weights) = membership
+    (rangeVerts, rangeGroups, rangeWeights) = rangeMembership
+    ranges = meshConfig["groups_by_range"]
+    names = []
+    for group in obj.vertex_groups:
+        if group.name not in ranges:
+            continue
+        real = np.sort(verts[groups == group.index])
+        expected = np.sort(rangeVerts[rangeGroups == group.index])
+        if not np.array_equal(real, expected) or (weights[groups == group.index] != 1.0).any():
+            names.append(group.name)
+    return (len(names) == 0, names)
+
+def weldUVs(polyVertices, uvs):
+    """
+    number the texture vertices of all loops (polyVertices and uvs are in polygon order)
+
+    UV coordinates closer than 1e-8 are considered the same. They are only welded when they belong to the same vertex,
+    so seams are kept. The new numbers are given in order of first appearance.
+    returns the number of the texture vertex per loop and the (T,2) UV coordinates of these numbers
+    """
+    quantized = np.round(np.asarray(uvs, dtype=np.float64) * 1e8).astype(np.int64)
+    keys = np.column_stack((polyVertices, quantized))
+    (unique, first, inverse) = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    order = np.argsort(first)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[order] = np.arange(len(first))
+    return (rank[inverse.ravel()], uvs[first[order]])
+
+def keptMesh(keep, edgeVertices, loopStart, loopTotal, loopVertices):
+    """
+    the part of a mesh with the vertices marked in keep, edges and polygons are kept when all of their vertices are kept
+
+    edgeVertices (E,2), loopStart, loopTotal (per polygon) and loopVertices (per loop) are the arrays of the mesh
+    returns the new vertex number of each vertex (-1 when removed), the kept edges and their vertices (new numbers),
+    the kept loops (in polygon order), the kept polygons and their number of loops
+    """
+    newIndex = np.where(keep, np.cumsum(keep) - 1, -1)
+    keepEdges = np.flatnonzero(keep[edgeVertices].all(axis=1))
+
+    loops = np.repeat(loopStart, loopTotal) + np.arange(int(loopTotal.sum())) - np.repeat(np.cumsum(loopTotal) - loopTotal, loopTotal)
+    keepPolygons = np.zeros(len(loopTotal), dtype=bool)
+    if len(loops) > 0:
+        keepPolygons = np.logical_and.reduceat(keep[loopVertices[loops]], np.cumsum(loopTotal) - loopTotal)
+    loops = loops[np.repeat(keepPolygons, loopTotal)]
+    keepPolygons = np.flatnonzero(keepPolygons)
+    return (newIndex, keepEdges, newIndex[edgeVertices[keepEdges]], loops, keepPolygons, loopTotal[keepPolygons])
+
+def edgeSource(sourceVertices, sourceEdges, newEdges, numVertices):
+    """
+    number of the source edge for each new edge (E,2), -1 for an edge without source
+
+    sourceVertices (S,2) are the vertices of sourceEdges in the numbers of the new mesh, the direction of an edge is ignored
+    """
+    source = np.full(len(newEdges), -1, dtype=np.int64)
+    if len(sourceEdges) == 0:
+        return source
+    keys = np.sort(sourceVertices, axis=1).astype(np.int64) @ np.array([numVertices, 1])
+    order = np.argsort(keys)
+    (keys, sourceEdges) = (keys[order], np.asarray(sourceEdges)[order])
+    newKeys = np.sort(newEdges, axis=1).astype(np.int64) @ np.array([numVertices, 1])
+    pos = np.minimum(np.searchsorted(keys, newKeys), len(keys) - 1)
+    found = keys[pos] == newKeys
+    source[found] = sourceEdges[pos[found]]
+    return source
+
+def groupWeightSets(groups, weights):
+    """
+    split group assignments into sets with the same group and weight in one pass, each set can be added with one call
+
+    returns group and weight of each set and a start array and assignment numbers (CSR),
+    assignments[start[k]:start[k+1]] belong to set k
+    """
+    (values, weightIndex) = np.unique(weights, return_inverse=True)
+    (keys, inverse) = np.unique(groups.astype(np.int64) * len(values) + weightIndex.ravel(), return_inverse=True)
+    (start, assignments) = _csr(inverse.ravel(), np.arange(len(groups)), len(keys))
+    return (keys // max(len(values), 1), values[keys % max(len(values), 1)], start, assignments)
+
+class MHMesh(MeshArrays):
+
+    def __init__(self, obj, context=None, allow_modifiers=False, membership=None):
         """
         Parse the mesh into a set of numpy arrays, separated per vertex group.
 
         There are two dicts here, where each item is an array.
 
-        vertexGroupVertices: The vertex coordinates for each vertex in the group
+        vertexGroupVertices: The vertex numbers of the vertices in the group, coordinates are in allVertexCoordinates
 
         vertexGroupNames: A mapping between each vertex groups's index and its name
+
+        membership can be supplied, if the result of vertexGroupMembership is already known
         """
+        MeshArrays.__init__(self)
 
         self.obj = obj
         self.data = obj.data
 
         if context and allow_modifiers:
             dg = context.evaluated_depsgraph_get()
-            obj2 = context.object.evaluated_get(dg)
+            obj2 = obj.evaluated_get(dg)
             mesh = obj2.to_mesh(preserve_all_data_layers=True, depsgraph=dg)
             self.data = mesh
 
-        self.vertexGroupVertices = dict()
-        self.vertexGroupNames = dict()
-        self._seedGroups = dict()
-        self.vertPolygons = {}  # will contain all polygons connected to a vertex, needed for efficiency (bestFace search)
-
-        # additional helper indices, filled by getAdditionalIndices
+        # additional helper indices (vertEdge...) are filled by getAdditionalIndices
         #
-        self.vertEdges = {}     # will contain all edges connected to a vertex
-        self.edgePolygons = {}  # will contain all polygons connected to an edge
-        self.polygonEdges = {}  # will contain all edges a polygon is using
-        self.polygonNeighbors = {} # will contain neighbor-polygons/faces
-        self.uvFaceVerts = {}   # will contain UV-vertices for wavefront export 
-        self.texVerts = {}      # will vertex number for UV
+        self.uvFaceVerts = None # will contain UV-vertex number per loop for wavefront export
+        self.texVerts = None    # will contain the UV coordinates of these numbers
 
         self.has_uv = False
 
@@ -48,26 +193,7 @@ class MHMesh:
 
         for group in obj.vertex_groups:
             if not group.name in self.vertexGroupNames:
-                ind = int(group.index)
-                self.vertexGroupNames[ind] = group.name
-                self._seedGroups[ind] = []
-
-        for vertex in self.data.vertices:
-            self.vertPolygons[vertex.index] = []    # supply an index to be filled, will contain all polygons connected to a vertex
-            for group in vertex.groups:
-                groupIndex = int(group.group)
-                if not int(groupIndex) in self.vertexGroupNames:
-                    print("Vertex says it has group with index " + str(groupIndex) + ", but that group does not exist. Will ignore this vertex group assignment.")
-                else:
-                    seedGroup = self._seedGroups[groupIndex]
-                    vertDef = [int(vertex.index), float(vertex.co[0]), float(vertex.co[1]), float(vertex.co[2])] # Index, x, y, z
-                    seedGroup.append(vertDef)
-
-        # supply an index of all polygons connected to a vertex
-        #
-        for polygon in self.data.polygons:
-            for vertex in polygon.vertices:
-                self.vertPolygons[vertex].append(polygon)
+                self.vertexGroupNames[int(group.index)] = group.name
 
         # Get the count of vertices in the object
         vertexCount = len(self.data.vertices)
@@ -79,113 +205,55 @@ class MHMesh:
         self.data.vertices.foreach_get('co', self.allVertexCoordinates)
         self.allVertexCoordinates.shape = (vertexCount, 3)
 
-        for groupIndex in self._seedGroups.keys():
-            self.vertexGroupVertices[groupIndex] = self._seedGroups[groupIndex]
+        self._groupIndices(membership)
+        self._polygonIndices()
 
-    def vertexGroupNameToIndex(self, vertexGroupName):
-        for idx in self.vertexGroupNames.keys():
-            if self.vertexGroupNames[idx] == vertexGroupName:
-                return idx
-        print("Could not find vertex group " + vertexGroupName + " in this mesh. Available names are:")
-        print(self.vertexGroupNames)
-        return None
+    def _groupIndices(self, membership):
+        """
+        Read all vertex group assignments once, see MeshArrays.setGroups
+        """
+        if membership is None:
+            membership = vertexGroupMembership(self.data)
+        (verts, groups, weights) = membership
+        self.setGroups(verts, groups, weights)
 
-    def vertexGroupKDTree(self, vertexGroupName):
-        obj = self.obj
+    def _polygonIndices(self):
+        """
+        Read the polygons and bring the loops in polygon order, see MeshArrays.setPolygons
+        """
+        mesh = self.data
+        polygonCount = len(mesh.polygons)
 
-        #
-        # first find the group
-        for group in obj.vertex_groups:
-            if group.name == vertexGroupName:
-                #
-                # now find all vertices belonging to the group, we first need size of the KDTree
-                # we append all vertex numbers to a temporary array, so that we don't have to do the work twice
-                #
-                tmp_varray = []
-                groupIndex = group.index
-                for vertex in self.data.vertices:
-                        for vgroup in vertex.groups:
-                            if groupIndex == vgroup.group:
-                                tmp_varray.append(vertex)
-
-                size = len(tmp_varray)
-
-                if size < 3:
-                    return (size, None)
-                #
-                # in case of a rigid group
-                #
-                if size == 3:
-                    return (size, tmp_varray)
-
-                # in case we have elements create the kd-tree and balance it
-                #
-                if size > 0:
-                    kd = mathutils.kdtree.KDTree(size)
-                    for vertex in tmp_varray:
-                        kd.insert(vertex.co, vertex.index)
-                    kd.balance()
-                    return (size, kd)
-
-        return (0, None)
+        loopStart = np.zeros(polygonCount, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loopStart)
+        polyLoopTotal = np.zeros(polygonCount, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', polyLoopTotal)
+        loopVertices = np.zeros(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loopVertices)
+
+        polyStart = np.cumsum(polyLoopTotal) - polyLoopTotal
+        self._loopOrder = np.repeat(loopStart - polyStart, polyLoopTotal) + np.arange(len(loopVertices))
+        self.setPolygons(polyLoopTotal, loopVertices[self._loopOrder])
+
+    def rebind(self, obj):
+        """
+        assign a new blender object with identical mesh (used for cached meshes)
+        """
+        self.obj = obj
+        self.data = obj.data
 
     # 
-    # generates special indices to speed up searches and also used for UV-mapping
+    # generates special indices to speed up searches
     # these indices are only needed for clothes and so it is not part of the init itself
     #
     def getAdditionalIndices(self):
         mesh = self.data
+        edgeCount = len(mesh.edges)
 
-        # supply an index of all edges connected to a vertex
-        #
-        for vertex in mesh.vertices:
-            self.vertEdges[vertex.index] = []
-
-        for edge in mesh.edges:
-            for vertex in edge.vertices:
-                self.vertEdges[vertex].append(edge)
-
-        # in case we need that (we need for a high number of vertices in MakeHuman
-        #
-        self.max_poles = max(len(self.vertEdges[x]) for x in self.vertEdges)
-
-        # now make a connection between polygons and edges in both directions
-        #
-        for edge in mesh.edges:
-            self.edgePolygons[edge.index] = []
-
-        for polygon in mesh.polygons:
-            self.polygonEdges[polygon.index] = []
-
-        # create a polygon-entry for an edge and an edge entry for a polygon,
-        # if both vertices of the edge belong to the polygon
-        # avoid double entries
-
-        for polygon in mesh.polygons:
-            for vertex in polygon.vertices:
-                for edge in self.vertEdges[vertex]:
-                    v0 = edge.vertices[0]
-                    v1 = edge.vertices[1]
-                    if (v0 in polygon.vertices) and (v1 in polygon.vertices):
-                        if polygon not in self.edgePolygons[edge.index]:
-                            self.edgePolygons[edge.index].append(polygon)
-                        if edge not in self.polygonEdges[polygon.index]:
-                            self.polygonEdges[polygon.index].append(edge)
-
-
-        # evaluate polygon neighbors (or faces neighbors)
-        #
-        # an entry containing edge number and polygon number is created
-
-        for polygon in mesh.polygons:
-            self.polygonNeighbors[polygon.index] = []
-
-        for polygon in mesh.polygons:
-            for edge in self.polygonEdges[polygon.index]:
-                for neighbor in self.edgePolygons[edge.index]:
-                    if neighbor != polygon:                 # do not add yourself :-)
-                        self.polygonNeighbors[polygon.index].append((edge,neighbor))
-
+        edgeVertices = np.zeros(edgeCount * 2, dtype=np.int32)
+        mesh.edges.foreach_get('vertices', edgeVertices)
+        edgeVertices.shape = (edgeCount, 2)
+        self.setEdges(edgeVertices)
 
     #
     # create a UV/Polygon table for a texture
@@ -201,44 +269,17 @@ class MHMesh:
             return 
 
         #
-        # add UV-verts to all polygons as an array
+        # read all UV coordinates at once, in polygon order
         #
-        for polygon in mesh.polygons:
-            self.uvFaceVerts[polygon.index] = []
+        uvs = np.zeros(len(mesh.loops) * 2, dtype=np.float32)
+        uvlayer.data.foreach_get('uv', uvs)
+        uvs.shape = (len(mesh.loops), 2)
+        uvs = uvs[self._loopOrder]
 
+        # texVerts will contain the UV coordinates, uvFaceVerts the number of the texture vertex per loop,
+        # uvFaceVerts[polyStart[p]:polyStart[p+1]] are the entries of polygon p
         #
-        # collect face vertices and append all to uvFaceVerts list
-        # vtn counts numbers of new faces
-        # if the distance to neighbor vertex on UV map is less than < 1e-8 an existing entry is used otherwise a new entry is created
-        # uvFaceVerts will contain the entry
-        #
-        vtn = 0
-        n = 0
-
-        for polygon in mesh.polygons:
-            for vn in polygon.vertices:
-                uv = uvlayer.data[n].uv
-                n += 1
-                #
-                # check if the entry is already existing
-                #
-                found = False
-                for (edge,neighbor) in self.polygonNeighbors[polygon.index]:
-                    for (vtn1,uv1) in self.uvFaceVerts[neighbor.index]:
-                        vec = uv - uv1
-                        if vec.length < 1e-8:
-                            self.uvFaceVerts[polygon.index].append((vtn1,uv))
-                            found = True
-                            break
-                    if found is True:
-                        break
-                #
-                # so we got a new one
-                #
-                if found is False:
-                    self.uvFaceVerts[polygon.index].append((vtn,uv))
-                    self.texVerts[vtn] = uv
-                    vtn +=1
+        (self.uvFaceVerts, self.texVerts) = weldUVs(self.polyVertices, uvs)
 
         self.has_uv = True
         return
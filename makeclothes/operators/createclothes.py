@@ -120,5 +120,7 @@ class MHC_OT_CreateClothesOperator(bpy.types.Operator):
             self.report({'ERROR'}, hint)
         else:
             self.report({'INFO'}, "Clothes were written to " + dirname)
+        if context.scene.MHProfile:
+            bpy.ops.makeclothes.infobox('INVOKE_DEFAULT', title="Profile of export", info=mc.profileInfo(), error="" if b else hint)
         return {'FINISHED'}
 
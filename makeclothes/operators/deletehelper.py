@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import bpy
+import numpy as np
+from ..mhmesh import vertexGroupMembership
+from ..utils import selectByMask
 
 def _deleteHelpers(obj):
     #
@@ -16,23 +19,20 @@ def _deleteHelpers(obj):
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     mesh = obj.data
-    for vert in mesh.vertices:
-        s = True
-        for vgroup in vert.groups:
-            if groupIndex == vgroup.group:
-                s = False
-        if s:
-            vert.select = True
+    (verts, groups, weights) = vertexGroupMembership(mesh)
+    inBody = np.zeros(len(mesh.vertices), dtype=bool)
+    inBody[verts[groups == groupIndex]] = True
+    selectByMask(mesh.vertices, ~inBody)
     bpy.ops.object.mode_set(mode = 'EDIT')
     bpy.ops.mesh.delete(type='VERT')
     bpy.ops.object.mode_set(mode = 'OBJECT')
     #
-    # delete empty groups
+    # delete empty groups, count the members of all groups at once
     #
-    for vg in obj.vertex_groups:
-        mtvg = not any(vg.index in [g.group for g in v.groups] for v in mesh.vertices)
-        if mtvg:
-            obj.vertex_groups.remove(vg)
+    (verts, groups, weights) = vertexGroupMembership(mesh)
+    members = np.bincount(groups, minlength=max([vg.index for vg in obj.vertex_groups]) + 1)
+    for vg in [vg for vg in obj.vertex_groups if members[vg.index] == 0]:
+        obj.vertex_groups.remove(vg)
     return (True, "")
 
 
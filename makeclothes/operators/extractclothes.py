@@ -2,11 +2,183 @@
 # -*- coding: utf-8 -*-
 
 import bpy
-import bmesh
+import numpy as np
 from ..core_makeclothes_functionality import _loadMeshJson
+from ..mhmesh import vertexGroupMembership, keptMesh, edgeSource, groupWeightSets
+
+# properties of edges and polygons copied to the extracted mesh, crease and bevel weight are attributes since blender 4.0
+#
+_EDGE_PROPERTIES = [('use_seam', bool), ('use_edge_sharp', bool)]
+if bpy.app.version < (4,0,0):
+    _EDGE_PROPERTIES += [('crease', np.float32), ('bevel_weight', np.float32)]
+_POLYGON_PROPERTIES = [('use_smooth', bool), ('material_index', np.int32)]
+
+# generic attributes (e.g. color attributes): name of the value, number of components and type per data type
+#
+_ATTRIBUTE_DATA = {
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int32),
+    'BOOLEAN': ('value', 1, bool),
+    'FLOAT2': ('vector', 2, np.float32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32)
+}
 
 _extractGroupDescription = "You can create a new mesh based on a vertex group in an imported human. Note that this is only possible if you imported with \"detailed helpers\". Without that, the only group possible to extract will be \"body\" and \"helpers\"."
 
+def _extractMesh(humanObj, newObj, groupNames):
+    """
+    fill the (empty) mesh of newObj with all vertices of humanObj belonging to at least one of the groups,
+    faces and edges are kept when all their vertices are kept, only these vertex groups are created
+
+    UV maps, seams, sharp edges, creases, smooth flags and material indices of the faces, the generic
+    attributes (e.g. color attributes) and the shape keys are copied as well
+    """
+    human = humanObj.data
+    mesh = newObj.data
+
+    # vertices to keep in one pass over the group membership
+    #
+    keepGroups = [group.index for group in humanObj.vertex_groups if group.name in groupNames]
+    (verts, groups, weights) = vertexGroupMembership(human)
+    inGroup = np.isin(groups, keepGroups)
+    keep = np.zeros(len(human.vertices), dtype=bool)
+    keep[verts[inGroup]] = True
+
+    coords = np.zeros(len(human.vertices) * 3, dtype=np.float32)
+    human.vertices.foreach_get('co', coords)
+    coords = coords.reshape(-1, 3)[keep]
+
+    edgeVertices = np.zeros(len(human.edges) * 2, dtype=np.int32)
+    human.edges.foreach_get('vertices', edgeVertices)
+    polygonCount = len(human.polygons)
+    loopStart = np.zeros(polygonCount, dtype=np.int32)
+    human.polygons.foreach_get('loop_start', loopStart)
+    loopTotal = np.zeros(polygonCount, dtype=np.int32)
+    human.polygons.foreach_get('loop_total', loopTotal)
+    loopVertices = np.zeros(len(human.loops), dtype=np.int32)
+    human.loops.foreach_get('vertex_index', loopVertices)
+
+    (newIndex, keepEdges, newEdgeVertices, loops, keepPolygons, newLoopTotal) = keptMesh(keep, edgeVertices.reshape(-1, 2),
+            loopStart, loopTotal, loopVertices)
+
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set('co', coords.ravel())
+    mesh.edges.add(len(newEdgeVertices))
+    mesh.edges.foreach_set('vertices', newEdgeVertices.astype(np.int32).ravel())
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set('vertex_index', newIndex[loopVertices[loops]].astype(np.int32))
+    mesh.polygons.add(len(newLoopTotal))
+    mesh.polygons.foreach_set('loop_start', (np.cumsum(newLoopTotal) - newLoopTotal).astype(np.int32))
+
+    for layer in human.uv_layers:
+        uvs = np.zeros(len(human.loops) * 2, dtype=np.float32)
+        layer.data.foreach_get('uv', uvs)
+        newLayer = mesh.uv_layers.new(name=layer.name)
+        newLayer.data.foreach_set('uv', uvs.reshape(-1, 2)[loops].ravel())
+
+    mesh.update(calc_edges=True)
+
+    # update can change the order of the edges, so the human edge of each new edge is searched by its vertices
+    #
+    newEdges = np.zeros(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', newEdges)
+    source = edgeSource(newEdgeVertices, keepEdges, newEdges.reshape(-1, 2), len(coords))
+
+    _copyProperties(human.edges, mesh.edges, _EDGE_PROPERTIES, source)
+    _copyProperties(human.polygons, mesh.polygons, _POLYGON_PROPERTIES, keepPolygons)
+    _copyAttributes(human, mesh, { 'POINT': np.flatnonzero(keep), 'EDGE': source, 'FACE': keepPolygons, 'CORNER': loops })
+
+    # create the groups to keep only, the assignments are added per group and weight (normally all weights are 1.0)
+    #
+    newGroups = dict()
+    for group in humanObj.vertex_groups:
+        if group.index in keepGroups:
+            newGroups[group.index] = newObj.vertex_groups.new(name=group.name)
+    memberVerts = newIndex[verts[inGroup]]
+    (setGroups, setWeights, start, assignments) = groupWeightSets(groups[inGroup], weights[inGroup])
+    for n in range(len(setGroups)):
+        newGroups[int(setGroups[n])].add(memberVerts[assignments[start[n]:start[n + 1]]].tolist(), float(setWeights[n]), 'REPLACE')
+
+    _copyShapeKeys(humanObj, newObj, keep)
+
+def _copyProperties(source, target, properties, sourceIndex):
+    """
+    copy properties of all elements (edges or polygons), sourceIndex is the number of the source element
+    for each target element (-1: no source, the value of the target is kept)
+    """
+    found = sourceIndex >= 0
+    for (name, dtype) in properties:
+        values = np.zeros(len(source), dtype=dtype)
+        source.foreach_get(name, values)
+        newValues = np.zeros(len(target), dtype=dtype)
+        target.foreach_get(name, newValues)
+        newValues[found] = values[sourceIndex[found]]
+        target.foreach_set(name, newValues)
+
+def _copyAttributes(human, mesh, sourceIndex):
+    """
+    copy the generic attributes (e.g. color attributes) not already existing on the new mesh, sourceIndex contains
+    the source element of each target element per domain, internal attributes and UV maps are skipped
+    """
+    if not hasattr(human, "attributes"):
+        return
+    uvNames = [layer.name for layer in human.uv_layers]
+    for attribute in human.attributes:
+        name = attribute.name
+        if name.startswith(".") or name == "position" or name in uvNames or name in mesh.attributes:
+            continue
+        if attribute.data_type not in _ATTRIBUTE_DATA or attribute.domain not in sourceIndex:
+            continue
+
+        (value, components, dtype) = _ATTRIBUTE_DATA[attribute.data_type]
+        values = np.zeros(len(attribute.data) * components, dtype=dtype)
+        attribute.data.foreach_get(value, values)
+        values = values.reshape(-1, components)
+
+        index = sourceIndex[attribute.domain]
+        found = index >= 0
+        newValues = np.zeros((len(index), components), dtype=dtype)
+        newValues[found] = values[index[found]]
+        newAttribute = mesh.attributes.new(name=name, type=attribute.data_type, domain=attribute.domain)
+        newAttribute.data.foreach_set(value, newValues.ravel())
+
+    if hasattr(human, "color_attributes") and human.color_attributes.active_color is not None:
+        name = human.color_attributes.active_color.name
+        if name in mesh.color_attributes:
+            mesh.color_attributes.active_color = mesh.color_attributes[name]
+
+def _copyShapeKeys(humanObj, newObj, keep):
+    """
+    create all shape keys of the human on newObj with the coordinates of the kept vertices and the same settings,
+    the vertex group of a key is only used when it was extracted
+    """
+    keys = humanObj.data.shape_keys
+    if keys is None:
+        return
+
+    for block in keys.key_blocks:
+        coords = np.zeros(len(block.data) * 3, dtype=np.float32)
+        block.data.foreach_get('co', coords)
+        newBlock = newObj.shape_key_add(name=block.name, from_mix=False)
+        newBlock.data.foreach_set('co', coords.reshape(-1, 3)[keep].ravel())
+        newBlock.slider_min = block.slider_min
+        newBlock.slider_max = block.slider_max
+        newBlock.value = block.value
+        newBlock.interpolation = block.interpolation
+        newBlock.mute = block.mute
+        if block.vertex_group in newObj.vertex_groups:
+            newBlock.vertex_group = block.vertex_group
+
+    # the relative keys can only be assigned when all keys exist
+    #
+    newKeys = newObj.data.shape_keys
+    newKeys.use_relative = keys.use_relative
+    for block in keys.key_blocks:
+        newKeys.key_blocks[block.name].relative_key = newKeys.key_blocks[block.relative_key.name]
+
 def EvaluateGroupsCallback(self, context):
     _extractGroup = []
 
@@ -88,74 +260,11 @@ class MHC_OT_ExtractClothesOperator(bpy.types.Operator):
         context.collection.objects.link(newObj)
         context.view_layer.objects.active = newObj
 
-        bmOld = bmesh.new()
-        bmOld.from_mesh(humanObj.data)
-
-        bmNew = bmOld.copy()
-
-        groupIndexes = dict()
-
-        for group in humanObj.vertex_groups:
-            vg = newObj.vertex_groups.new(name=group.name)
-            if group.name in groupNames:
-                groupIndexes[group.index] = group.name
-
-        print(groupIndexes)
-
-        # delete vertices which do not belong to one of the groups of groupIndexes
-        #
-        vertsToDelete = []
-        for vert in humanObj.data.vertices:
-            if len(vert.groups) > 0:
-                doDelete = True
-                for grp in vert.groups:
-                    gidx = grp.group
-                    if gidx in groupIndexes:        # so it is at least in one group not to be deleted ...
-                        doDelete = False
-                        break
-                if doDelete is True:
-                    vertsToDelete.append(vert.index)
-            else:   # delete those belonging to no group
-                vertsToDelete.append(vert.index)
-
-        vertsToDelete.sort(reverse=True)
-
-        for vertIdx in vertsToDelete:
-            bmNew.verts.ensure_lookup_table()
-            v = bmNew.verts[vertIdx]
-            bmNew.verts.remove(v)
-
-        mesh = context.object.data
-
-        bmNew.to_mesh(mesh)
-        bmNew.free()
-
-        bmOld.free()
+        _extractMesh(humanObj, newObj, groupNames)
 
         newObj.location = humanObj.location
 
         newObj.MhObjectType = "Clothes"
 
-        # This is a stupid way to do it, but:
-        #
-        # * cloning a bmesh keeps vgroup index settings on each vertex
-        # * cloning a bmesh *does not* also clone vgroups
-        # * You can't create a vgroup with a specific index (index is read-only)
-        #
-        # Thus the only recourse is copying all vgroups and then delete the ones not relevant
-
-        for group in humanObj.vertex_groups:
-            vg = newObj.vertex_groups.new(name=group.name)
-
-        groupsToKeep = []
-
-        for vgidx in groupIndexes.keys():
-            name = groupIndexes[vgidx]
-            groupsToKeep.append(name)
-
-        for group in newObj.vertex_groups:
-            if not group.name in groupsToKeep:
-                newObj.vertex_groups.remove(group)
-
         self.report({'INFO'}, "Extracted " + what)
         return {'FINISHED'}
@@ -2,12 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import bpy
-import os
-from mathutils import Vector
+import numpy as np
 from bpy_extras.io_utils import ImportHelper
 from bpy.props import StringProperty
 from ..utils import getClothesRoot, loadObjFile
 from ..core_makeclothes_functionality import _loadMeshJson
+from ..mhcloparser import readMhclo
 from addon_utils import check,paths,enable,modules
 
 class import_mhclo:
@@ -23,7 +23,9 @@ class import_mhclo:
         self.tags = ""
         self.zdepth = 50
         self.first = 0
-        self.verts = {}
+        self.indices = None     # (N,3) arrays of the verts section, see mhcloparser
+        self.weights = None
+        self.offsets = None
         self.delverts = []
         self.delete = False
         self.delete_group = "Delete"
@@ -34,8 +36,13 @@ class import_mhclo:
         if human is None:
             return
 
+        # read all human coordinates at once
+        #
         hverts = human.data.vertices
         hl = len(hverts)        # number of base vertices
+        hco = np.zeros(hl * 3, dtype=np.float64)
+        hverts.foreach_get('co', hco)
+        hco.shape = (hl, 3)
 
         # Figure out an appropriate fallback scale in case scale isn't set explicitly in mhclo
         # Use 1.0 if not set as attribute on human, otherwise use the attribute from human
@@ -56,27 +63,28 @@ class import_mhclo:
 
             # get sizes
             #
-            s0 = abs(hverts[self.xs[0]].co[0] - hverts[self.xs[1]].co[0]) / self.xs[2]
-            s2 = abs(hverts[self.ys[0]].co[2] - hverts[self.ys[1]].co[2]) / self.ys[2]
-            s1 = abs(hverts[self.zs[0]].co[1] - hverts[self.zs[1]].co[1]) / self.zs[2]
+            s0 = abs(hco[self.xs[0]][0] - hco[self.xs[1]][0]) / self.xs[2]
+            s2 = abs(hco[self.ys[0]][2] - hco[self.ys[1]][2]) / self.ys[2]
+            s1 = abs(hco[self.zs[0]][1] - hco[self.zs[1]][1]) / self.zs[2]
 
         dverts = self.clothes.data.vertices
+        dl = min(len(dverts), len(self.indices))
+        dco = np.zeros(len(dverts) * 3, dtype=np.float64)
+        dverts.foreach_get('co', dco)
+        dco.shape = (len(dverts), 3)
 
-        for n in range(len(dverts)):
-            s = self.verts[n]
-            (n1, n2, n3) = s["verts"]
+        # test if we inside mesh, if not, no chance, these vertices keep their position
+        #
+        indices = self.indices[:dl]
+        inside = np.flatnonzero((indices < hl).all(axis=1))
 
-            # test if we inside mesh, if not, no chance
-            #
-            if n1 >= hl or n2 > hl or n3 >= hl:
-                continue
+        # weighted sum of the three human vertices plus the scaled offset for all vertices at once
+        #
+        triangles = hco[indices[inside]]                    # (N,3,3)
+        dco[inside] = np.einsum('ij,ijk->ik', self.weights[inside], triangles) + self.offsets[inside] * (s0, s1, s2)
 
-            offset = [s["offsets"][0]*s0, s["offsets"][1]*s1, s["offsets"][2]*s2]
-            dverts[n].co = \
-                s["weights"][0] * hverts[n1].co + \
-                s["weights"][1] * hverts[n2].co + \
-                s["weights"][2] * hverts[n3].co + \
-                Vector(offset)
+        dverts.foreach_set('co', dco.ravel())
+        self.clothes.data.update()
 
         # if delete_verts is existing, create a group on the body
         #
@@ -92,10 +100,7 @@ class import_mhclo:
             # now for security reasons do a local copy of delete_verts
             # with vertex number lower than the maxnumber of the human
             #
-            dellist = []
-            for n in  self.delverts:
-                if n < hl:
-                    dellist.append(n)
+            dellist = self.delverts[self.delverts < hl].tolist()
             #
             # and create new one
             #
@@ -106,116 +111,28 @@ class import_mhclo:
 
 
     def load (self, context, props):
-        realpath = os.path.realpath(os.path.expanduser(props.filepath))
-        folder = os.path.dirname(realpath)
-
         try:
-            fp = open(props.filepath, "r")
-        except:
+            data = readMhclo(props.filepath)
+        except (IOError, ValueError, IndexError):
             return None
 
-        vn = 0
-        status = ""
-
-        mhmat = None
-
-        for line in fp:
-            words= line.split()
-
-            l = len(words)
-
-            if l == 0:
-                status = ""
-                continue
-
-            # at least grab what you get from the comment
-            #
-            if words[0] == '#':
-                if l > 2:
-                    key = words[1].lower()
-                    if "author" in key:
-                        self.author = words[2]
-                    elif "license" in key:
-                        if "by" in line.lower():
-                            self.license = "CC-BY"
-                        elif "apgl" in line.lower():
-                            self.license = "AGPL"
-                    elif "description" in key:
-                        self.description = " ".join(words[2:])
-                continue
-
-            if words[0] == "material":
-                mhmat = os.path.join(folder, words[1])
-
-            # read vertices lines
-            #
-            if status == 'v':
-                if words[0].isnumeric() is False:
-                    status = ""
-                    continue
-                if l == 1:
-                    v = int(words[0])
-                    self.verts[vn] = {'verts': (v,v,v), 'weights': (1,0,0), 'offsets': Vector((0,0,0))}
-                else:
-                    v0 = int(words[0])
-                    v1 = int(words[1])
-                    v2 = int(words[2])
-                    w0 = float(words[3])
-                    w1 = float(words[4])
-                    w2 = float(words[5])
-                    d0 = float(words[6])
-                    d1 = float(words[7])
-                    d2 = float(words[8])
-                    self.verts[vn] = {'verts': (v0,v1,v2), 'weights': (w0,w1,w2), 'offsets': Vector((d0,-d2,d1))}
-                vn += 1
-                continue
-            elif status == 'd':
-                if words[0].isnumeric() is False:
-                    status = ""
-                    continue
-                sequence = False
-                for v in words:
-                    if v == "-":
-                        sequence = True
-                    else:
-                        v1 = int(v)
-                        if sequence:
-                            for vn in range(v0,v1+1):
-                                self.delverts.append(vn)
-                            sequence = False
-                        else:
-                            self.delverts.append(v1)
-                        v0 = v1
-                continue
-
-            key = words[0]
-            status = ""
-            if key == 'obj_file':
-                self.obj_file = os.path.join(folder, words[1])
-                print ("Loading: " + self.obj_file + "\n")
-            elif key == 'verts':
-                if len(words) > 1:
-                    self.first = int(words[1])      # this value will be ignored, we always start from zero
-                    status = "v"
-            elif key == 'x_scale':
-                self.xs = (int(words[1]), int(words[2]), float(words[3]))
-            elif key == 'y_scale':
-                self.ys = (int(words[1]), int(words[2]), float(words[3]))
-            elif key == 'z_scale':
-                self.zs = (int(words[1]), int(words[2]), float(words[3]))
-            elif key == 'name':
-                self.name = words[1]
-            elif key == 'z_depth':
-                self.zdepth = int(words[1])
-            elif key == 'tag':
-                if self.tags != "":
-                    self.tags += ","
-                self.tags += words[1].lower()
-            elif key == 'delete_verts':
-                self.delete = True
-                status = 'd'
-
-        fp.close
+        self.obj_file = data.obj_file
+        self.xs = data.xs
+        self.ys = data.ys
+        self.zs = data.zs
+        self.author = data.author
+        self.license = data.license
+        self.name = data.name
+        self.description = data.description
+        self.tags = data.tags
+        self.zdepth = data.zdepth
+        self.first = data.first
+        self.indices = data.indices
+        self.weights = data.weights
+        self.offsets = data.offsets
+        self.delverts = data.delverts
+        self.delete = data.delete
+        mhmat = data.material
 
         obj = None
 
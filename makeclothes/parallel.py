@@ -0,0 +1,100 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# fit many pieces of clothes to the same human in several processes
+#
+# the arrays of the human are copied once into shared memory, the worker processes attach to it, so
+# only the arrays of the clothes and the resulting tables are transferred. Workers are started with
+# "spawn" and do not need blender, they only import fitting.py.
+#
+
+import sys
+import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
+
+from .fitting import MeshArrays, VertexMatchTable, fitClothes
+
+_workerHuman = None         # human of the worker process, attached to the shared memory
+_workerMemory = None        # keeps shared memory open as long as the worker lives
+
+def _shareArrays(arrays):
+    """
+    copy all arrays into one block of shared memory, returns the memory and the layout
+    (list of name, dtype, shape, offset) needed to attach to it
+    """
+    layout = []
+    size = 0
+    for (name, value) in arrays.items():
+        value = np.ascontiguousarray(value)
+        size = (size + 15) & ~15            # keep the arrays aligned
+        layout.append((name, value.dtype.str, value.shape, size))
+        size += value.nbytes
+
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (name, dtype, shape, offset) in layout:
+        target = np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)
+        target[...] = arrays[name]
+    return (memory, layout)
+
+def _attachArrays(memory, layout):
+    arrays = dict()
+    for (name, dtype, shape, offset) in layout:
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)
+    return arrays
+
+def _initWorker(memoryName, layout, vertexGroupNames):
+    global _workerHuman, _workerMemory
+
+    # spawned workers share the resource tracker of the main process, which also removes the memory
+    #
+    _workerMemory = shared_memory.SharedMemory(name=memoryName)
+    _workerHuman = MeshArrays.fromArrays(_attachArrays(_workerMemory, layout), vertexGroupNames)
+
+def _fitTask(task):
+    (arrays, vertexGroupNames, mode) = task
+    clothes = MeshArrays.fromArrays(arrays, vertexGroupNames)
+    (b, text, table, isTriangle) = fitClothes(_workerHuman, clothes, mode=mode)
+    return (b, text, isTriangle, table.indices, table.weights, table.offsets, table.exact)
+
+def fitClothesParallel(human, clothesList, workers=2, mode="VERTEX"):
+    """
+    fit all meshes of clothesList (MeshArrays or MHMesh) to human, the fitting is done in worker processes
+    mode is the fitting mode ("VERTEX" or "SURFACE")
+
+    returns a list with one result per piece of clothes in the same format as fitting.fitClothes
+    """
+    tasks = [(clothes.toArrays(), clothes.vertexGroupNames, mode) for clothes in clothesList]
+    if workers < 2 or len(tasks) < 2:
+        return [fitClothes(human, clothes, mode=mode) for clothes in clothesList]
+
+    (memory, layout) = _shareArrays(human.toArrays())
+
+    # inside blender __main__ is not a module a new process can import, so hide it while starting the workers
+    #
+    main = sys.modules["__main__"]
+    mainFile = getattr(main, "__file__", None)
+    mainSpec = getattr(main, "__spec__", None)
+    if mainFile is not None:
+        del main.__file__
+    main.__spec__ = None
+
+    try:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(min(workers, len(tasks)), initializer=_initWorker,
+                initargs=(memory.name, layout, human.vertexGroupNames)) as pool:
+            results = pool.map(_fitTask, tasks)
+    finally:
+        if mainFile is not None:
+            main.__file__ = mainFile
+        main.__spec__ = mainSpec
+        memory.close()
+        memory.unlink()
+
+    fitResults = []
+    for (b, text, isTriangle, indices, weights, offsets, exact) in results:
+        table = VertexMatchTable(len(exact))
+        (table.indices, table.weights, table.offsets, table.exact) = (indices, weights, offsets, exact)
+        fitResults.append((b, text, table, isTriangle))
+    return fitResults
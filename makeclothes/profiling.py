@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# timing of the stages of an export, only the standard library is used
+#
+# a disabled profiler hands out one shared empty context, so the instrumented code costs nothing
+# but a method call. Optionally the peak of the allocated memory of each stage is measured with tracemalloc.
+#
+
+import json
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+_NOTHING = nullcontext()
+_lastProfile = None         # result of the last export, see lastProfile
+
+def lastProfile():
+    """
+    result of the last profiled export (see StageProfiler.results) or None, to be used by scripts
+    which started the export with an operator
+    """
+    return _lastProfile
+
+class _Stage():
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        if self.profiler.memory:
+            tracemalloc.reset_peak()
+            self.memStart = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        seconds = time.perf_counter() - self.start
+        peak = None
+        if self.profiler.memory:
+            peak = tracemalloc.get_traced_memory()[1] - self.memStart
+        self.profiler.add(self.name, seconds, peak)
+        return False
+
+class StageProfiler():
+
+    def __init__(self, enabled=False, memory=False):
+        """
+        enabled switches the measurement on, memory additionally measures the memory peak of each stage
+        """
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.stages = {}            # name => [seconds, calls, peak in bytes or None], in order of first call
+        self.ownTracing = False
+
+    def start(self):
+        """
+        start tracing the memory, done by the first stage, if not called before
+        """
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.ownTracing = True
+
+    def stop(self):
+        """
+        end the measurement, the result is also available by lastProfile
+        """
+        global _lastProfile
+
+        if self.ownTracing:
+            tracemalloc.stop()
+            self.ownTracing = False
+        if self.enabled:
+            _lastProfile = self.results()
+
+    def stage(self, name):
+        """
+        context to measure one stage, a stage used more than once is summed up
+        """
+        if not self.enabled:
+            return _NOTHING
+        self.start()
+        return _Stage(self, name)
+
+    def add(self, name, seconds, peak=None):
+        if name not in self.stages:
+            self.stages[name] = [0.0, 0, None]
+        entry = self.stages[name]
+        entry[0] += seconds
+        entry[1] += 1
+        if peak is not None:
+            entry[2] = peak if entry[2] is None else max(entry[2], peak)
+
+    def results(self):
+        """
+        returns a dict name => {"seconds", "calls", "peak"}, "peak" only when memory is measured
+        """
+        result = {}
+        for (name, (seconds, calls, peak)) in self.stages.items():
+            result[name] = { "seconds": seconds, "calls": calls }
+            if peak is not None:
+                result[name]["peak"] = peak
+        return result
+
+    def infoText(self):
+        """
+        one line per stage for the infobox
+        """
+        lines = []
+        total = 0.0
+        for (name, (seconds, calls, peak)) in self.stages.items():
+            line = "\001%s: %.3f s" % (name, seconds)
+            if calls > 1:
+                line += " (%d calls)" % calls
+            if peak is not None:
+                line += ", peak %.1f MB" % (peak / 1048576.0)
+            lines.append(line)
+            total += seconds
+        lines.append("")
+        lines.append("Total: %.3f s" % total)
+        return "\n".join(lines)
+
+    def writeJson(self, filename):
+        """
+        returns (success, error text)
+        """
+        try:
+            with open(filename, "w") as f:
+                json.dump(self.results(), f, indent=2)
+        except IOError as e:
+            return (False, "Cannot write profile " + filename + ": " + str(e))
+        return (True, "")
@@ -2,6 +2,45 @@
 # -*- coding: utf-8 -*-
 
 import bpy
+import numpy as np
+from .mhmesh import vertexGroupMembership, rangeMembership, verifyRangeMembership
+from .core_makeclothes_functionality import _loadMeshJson
+from .utils import selectByMask
+
+### --- MESH ANALYSIS --- ###
+
+class _MeshAnalysis:
+
+    def __init__(self, obj):
+        """
+        scan the mesh once, all checks are answered from these arrays
+
+        membership: (verts, groups, weights) like vertexGroupMembership
+        groupCount: number of vertex groups per vertex
+        corrupt:    vertex is assigned to a group which does not exist
+        inFace:     vertex is used by at least one polygon
+        faceSizes:  number of vertices per polygon
+        edgeVertices: both vertices of all edges as flat array (in edge order), valence: number of edges per vertex
+        """
+        mesh = obj.data
+        numVertices = len(mesh.vertices)
+
+        (verts, groups, weights) = vertexGroupMembership(mesh)
+        self.membership = (verts, groups, weights)
+        self.groupCount = np.bincount(verts, minlength=numVertices)
+        valid = np.isin(groups, [vg.index for vg in obj.vertex_groups])
+        self.corrupt = np.zeros(numVertices, dtype=bool)
+        self.corrupt[verts[~valid]] = True
+
+        self.faceSizes = np.zeros(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', self.faceSizes)
+        loopVertices = np.zeros(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loopVertices)
+        self.inFace = np.bincount(loopVertices, minlength=numVertices) > 0
+
+        self.edgeVertices = np.zeros(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get('vertices', self.edgeVertices)
+        self.valence = np.bincount(self.edgeVertices, minlength=numVertices)
 
 ### --- VERTEX GROUP CHECKS --- ###
 
@@ -11,15 +50,15 @@ def checkHasAnyVGroups(obj):
 # check if all vertices belong to a vertex group
 # markmesh will select the vertices without groups
 
-def checkAllVerticesBelongToAVGroup(obj, markmesh=False):
-    b = True
+def checkAllVerticesBelongToAVGroup(obj, markmesh=False, analysis=None):
+    if analysis is None:
+        analysis = _MeshAnalysis(obj)
     hint = ""
 
-    for vert in obj.data.vertices:
-        if len(vert.groups) < 1:
-            b = False
-            if markmesh is True:
-                vert.select = True
+    bad = analysis.groupCount < 1
+    b = not bad.any()
+    if b is False and markmesh is True:
+        selectByMask(obj.data.vertices, bad)
 
     if b is False and markmesh is True:
             hint = "Change to edit mode and assign selected vertices to a vertex group\n"
@@ -28,15 +67,15 @@ def checkAllVerticesBelongToAVGroup(obj, markmesh=False):
 # check if vertices belong to more than one group
 # markmesh will select the vertices with more then one group
 
-def checkAllVerticesBelongToAtMostOneVGroup(obj, markmesh=False):
-    b = True
+def checkAllVerticesBelongToAtMostOneVGroup(obj, markmesh=False, analysis=None):
+    if analysis is None:
+        analysis = _MeshAnalysis(obj)
     hint = ""
 
-    for vert in obj.data.vertices:
-        if len(vert.groups) > 1:
-            b = False
-            if markmesh is True:
-                vert.select = True
+    bad = analysis.groupCount > 1
+    b = not bad.any()
+    if b is False and markmesh is True:
+        selectByMask(obj.data.vertices, bad)
 
     if b is False and markmesh is True:
             hint = "Change to edit mode and remove all groups from selected vertices,\nthen assign them to only one group\n"
@@ -45,18 +84,14 @@ def checkAllVerticesBelongToAtMostOneVGroup(obj, markmesh=False):
 # check if group assignments are correct
 # markmesh will select bad assigned vertices
 
-def checkVertexGroupAssignmentsAreNotCorrupt(obj, markmesh=False):
-    validIndices = []
-    for vg in obj.vertex_groups:
-        validIndices.append(vg.index)
-    b = True
+def checkVertexGroupAssignmentsAreNotCorrupt(obj, markmesh=False, analysis=None):
+    if analysis is None:
+        analysis = _MeshAnalysis(obj)
     hint = ""
-    for vert in obj.data.vertices:
-        for group in vert.groups.keys():
-            if not int(group) in validIndices:
-                b = False
-                if markmesh is True:
-                    vert.select = True
+
+    b = not analysis.corrupt.any()
+    if b is False and markmesh is True:
+        selectByMask(obj.data.vertices, analysis.corrupt)
 
     if b is False and markmesh is True:
             hint = "Change to edit mode and re-assign selected vertices\n"
@@ -86,44 +121,40 @@ def checkAllVGroupsInFirstExistsInSecond(firstObj, secondObj):
 # if vertices belong to no faces at all it will also not work
 # markmesh will select stray vertices
 #
-def checkStrayVertices(obj, markmesh=False):
-    verts = obj.data.vertices
-    facesfound = {}
-    for v in verts:
-        facesfound[v.index] = False
-    for faces in obj.data.polygons:
-        for vn in faces.vertices:
-            facesfound[vn] = True
+def checkStrayVertices(obj, markmesh=False, analysis=None):
+    if analysis is None:
+        analysis = _MeshAnalysis(obj)
     info = ""
-    b = True
-    cnt = 0
-    for v in verts:
-        if not facesfound[v.index]:
-            if markmesh:
-                v.select = True
-            b = False
-            cnt += 1
+
+    stray = ~analysis.inFace
+    cnt = int(stray.sum())
+    b = cnt == 0
+    if markmesh and not b:
+        selectByMask(obj.data.vertices, stray)
     if b is False and markmesh is True:
         info = "Change to edit mode and delete selected vertices.\n"
     return (b, cnt, info)
 
-def checkNumberOfPoles(obj, max_def, markmesh=False):
-    verts = obj.data.vertices
-    edges = obj.data.edges
-    vertEdges = [0] * len( obj.data.vertices)
-    maxpole = 0
+def checkNumberOfPoles(obj, max_def, markmesh=False, analysis=None):
+    if analysis is None:
+        analysis = _MeshAnalysis(obj)
     info = ""
-    cnt = 0
 
-    for edge in edges:
-        for vertex in edge.vertices:
-            vertEdges[vertex] += 1
-            if vertEdges[vertex] > max_def:
-                maxpole = vertEdges[vertex]             # highest number
-                if vertEdges[vertex] == (max_def + 1):  # but only count them once
-                    if markmesh is True:
-                        verts[vertex].select = True
-                    cnt += 1
+    poles = analysis.valence > max_def
+    cnt = int(poles.sum())
+    maxpole = 0
+    if cnt > 0:
+        # the reported number is the running edge count of the last edge exceeding max_def
+        # (going through the edges in order), so count the edges per vertex in edge order
+        #
+        ends = analysis.edgeVertices
+        order = np.argsort(ends, kind='stable')
+        start = np.cumsum(analysis.valence) - analysis.valence
+        running = np.zeros(len(ends), dtype=np.int64)
+        running[order] = np.arange(len(ends)) - start[ends[order]] + 1
+        maxpole = int(running[np.flatnonzero(running > max_def)[-1]])
+        if markmesh is True:
+            selectByMask(obj.data.vertices, poles)
     if cnt > 1:
         info = "Max-Pole is " + str(maxpole) + ".\n"
         if markmesh is True:
@@ -134,15 +165,15 @@ def checkNumberOfPoles(obj, max_def, markmesh=False):
 # test if a face has more than 4 vertices
 # markmesh will select the polygons
 
-def checkFacesHaveAtMostFourVertices(obj, markmesh=False):
-    b = True
+def checkFacesHaveAtMostFourVertices(obj, markmesh=False, analysis=None):
+    if analysis is None:
+        analysis = _MeshAnalysis(obj)
     info = ""
 
-    for polygon in obj.data.polygons:
-        if len(polygon.vertices) > 4:
-            b = False
-            if markmesh is True:
-                polygon.select = True
+    bad = analysis.faceSizes > 4
+    b = not bad.any()
+    if b is False and markmesh is True:
+        selectByMask(obj.data.polygons, bad)
 
     if b is False and markmesh is True:
         info = "Change to edit mode and modify selected faces.\n"
@@ -152,13 +183,10 @@ def checkFacesHaveAtMostFourVertices(obj, markmesh=False):
 # test if the faces have the same number of vertices, either 3 or 4
 # markmesh will select the polygons which are less used in case of error
 
-def checkTriOrQuad(obj, markmesh):
-    cntarr = [0] *5
-
-    for polygon in obj.data.polygons:
-        l = len(polygon.vertices)
-        if l < 5:
-            cntarr[l] += 1
+def checkTriOrQuad(obj, markmesh, analysis=None):
+    if analysis is None:
+        analysis = _MeshAnalysis(obj)
+    cntarr = np.bincount(analysis.faceSizes[analysis.faceSizes < 5], minlength=5).tolist()
 
     if cntarr[3] == 0:
         return (True, "quad mesh")
@@ -177,9 +205,7 @@ def checkTriOrQuad(obj, markmesh):
 
     if markmesh is True:
         info += "Change to edit mode and modify selected faces.\n"
-        for polygon in obj.data.polygons:
-            if len(polygon.vertices) == disp:
-                polygon.select = True
+        selectByMask(obj.data.polygons, analysis.faceSizes == disp)
 
     return (False, info)
 
@@ -233,11 +259,27 @@ def checkSanityHuman(context):
     info += icon + "At least one vertex group is available.\n"
 
     icon = "\001"
-    (b, hint) = checkVertexGroupAssignmentsAreNotCorrupt(humanObj)
+    analysis = _MeshAnalysis(humanObj)
+    (b, hint) = checkVertexGroupAssignmentsAreNotCorrupt(humanObj, analysis=analysis)
     if not b:
         errortext += "The human object has vertices which belong non-existing\n" + hint
         icon = "\002"
     info += icon + "No vertex belongs to a non-existing group.\n"
+
+    # verification of the group ranges of a known base mesh, if they would be used
+    #
+    ranges = None
+    if context.scene.MHUseGroupRanges:
+        (meshtype, meshConfig) = _loadMeshJson(humanObj)
+        ranges = rangeMembership(humanObj, meshConfig)
+    if ranges is not None:
+        icon = "\001"
+        (b, names) = verifyRangeMembership(humanObj, analysis.membership, ranges, meshConfig)
+        if not b:
+            icon = "\003"
+            info += icon + "Vertex groups differ from the ranges of " + meshtype + ": " + ", ".join(names) + ".\nSwitch off \"Use group ranges\".\n"
+        else:
+            info += icon + "Vertex groups match the ranges of " + meshtype + ".\n"
     return (len(errortext) > 0, info, errortext)
 
 
@@ -262,8 +304,12 @@ def checkSanityClothes(obj, humanobj=None, markmesh=True, version2=False):
         bpy.ops.mesh.select_mode (type="VERT")
         bpy.ops.object.mode_set (mode="OBJECT")
 
+    # the mesh is only scanned once for all checks
+    #
+    analysis = _MeshAnalysis(obj)
+
     icon = "\001"
-    (b, cnt, hint) = checkStrayVertices(obj, markmesh)
+    (b, cnt, hint) = checkStrayVertices(obj, markmesh, analysis)
     if not b:
         icon = "\002"
         errortext += "Object has " + str(cnt) + " stray vertices.\n" + hint
@@ -276,7 +322,7 @@ def checkSanityClothes(obj, humanobj=None, markmesh=True, version2=False):
     if version2 is False:
         icon = "\001"
         suppress = 0
-        (b, hint) = checkFacesHaveAtMostFourVertices(obj, markmesh)
+        (b, hint) = checkFacesHaveAtMostFourVertices(obj, markmesh, analysis)
         if not b:
             errortext += "This object has at least one face with more than four vertices.\nN-gons are not supported by MakeHuman Version 1.\n" + hint
             errorcnt += 1
@@ -289,7 +335,7 @@ def checkSanityClothes(obj, humanobj=None, markmesh=True, version2=False):
         #
         if suppress == 0:
             icon = "\001"
-            (b, hint) = checkTriOrQuad(obj, markmesh)
+            (b, hint) = checkTriOrQuad(obj, markmesh, analysis)
             if not b:
                 errortext += "This object has faces with different numbers of vertices.\nTris *or* quads are supported in MakeHuman Version 1, but not a mix of the two.\n" + hint
                 errorcnt += 1
@@ -305,7 +351,7 @@ def checkSanityClothes(obj, humanobj=None, markmesh=True, version2=False):
     info += icon + "At least one vertex group must exist.\n"
 
     icon = "\001"
-    (b, hint) = checkAllVerticesBelongToAVGroup(obj, markmesh)
+    (b, hint) = checkAllVerticesBelongToAVGroup(obj, markmesh, analysis)
     if not b:
         errortext += "This object has vertices which do not belong to a vertex group.\n" + hint
         errorcnt += 1
@@ -314,7 +360,7 @@ def checkSanityClothes(obj, humanobj=None, markmesh=True, version2=False):
     info += icon + "All vertices belong to a vertex group.\n"
 
     icon = "\001"
-    (b, hint) = checkAllVerticesBelongToAtMostOneVGroup(obj, markmesh)
+    (b, hint) = checkAllVerticesBelongToAtMostOneVGroup(obj, markmesh, analysis)
     if not b:
         errortext += "This object has vertices which belong to multiple vertex groups.\n" + hint
         errorcnt += 1
@@ -323,7 +369,7 @@ def checkSanityClothes(obj, humanobj=None, markmesh=True, version2=False):
     info += icon + "No vertex belongs to multiple groups.\n"
 
     icon = "\001"
-    (b, hint) = checkVertexGroupAssignmentsAreNotCorrupt(obj, markmesh)
+    (b, hint) = checkVertexGroupAssignmentsAreNotCorrupt(obj, markmesh, analysis)
     if not b:
         errortext += "This object has vertices which belong non-existing vertex groups,\n" + hint
         errorcnt += 1
@@ -349,7 +395,7 @@ def checkSanityClothes(obj, humanobj=None, markmesh=True, version2=False):
         info += icon + "Object has " + str(cnt) + " UV-maps. " + hint +"\n"
 
     icon = "\001"
-    (b, cnt, hint) = checkNumberOfPoles(obj, max_def_poles, markmesh)
+    (b, cnt, hint) = checkNumberOfPoles(obj, max_def_poles, markmesh, analysis)
     if not b:
         icon = "\003"
         errortext += "Object has " + str(cnt) + " vertices with more than " + str(max_def_poles) + " edges attached (poles).\n" + hint
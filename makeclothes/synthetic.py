@@ -0,0 +1,58 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# synthetic meshes for the tests and the benchmark, only numpy is used
+#
+
+import numpy as np
+
+def syntheticMesh(numVertices, numGroups, radius, height, bottom, phase):
+    """
+    cylinder with about numVertices vertices, every third quad is split into two triangles
+
+    phase turns the mesh by a part of a column, so human and clothes vertices do not coincide
+    returns a dict with coords, polyLoopTotal, polyVertices, uvs (per loop), vertexGroupNames and membership,
+    each group contains a band of rows, so the groups are ranges of vertex numbers
+    """
+    rows = max(2, int(np.sqrt(numVertices / 2.0)))
+    cols = max(3, numVertices // rows)
+
+    (r, c) = np.divmod(np.arange(rows * cols), cols)
+    angle = 2.0 * np.pi * (c + phase) / cols
+    wobble = radius * (1.0 + 0.05 * np.sin(3.0 * angle) * np.cos(5.0 * r / rows))
+    coords = np.column_stack((wobble * np.cos(angle), wobble * np.sin(angle), bottom + height * r / (rows - 1)))
+
+    # quads between row r and r + 1, column c and c + 1 (the last column is connected to the first one)
+    #
+    (qr, qc) = np.divmod(np.arange((rows - 1) * cols), cols)
+    quads = np.column_stack((qr * cols + qc, qr * cols + (qc + 1) % cols, (qr + 1) * cols + (qc + 1) % cols, (qr + 1) * cols + qc))
+    quadUVs = np.stack((np.column_stack((qc, qr)), np.column_stack((qc + 1, qr)), np.column_stack((qc + 1, qr + 1)),
+            np.column_stack((qc, qr + 1))), axis=1) / (cols, rows - 1)
+
+    split = np.arange(len(quads)) % 3 == 0
+    tris = np.concatenate((quads[split][:, [0, 1, 2]], quads[split][:, [0, 2, 3]]))
+    triUVs = np.concatenate((quadUVs[split][:, [0, 1, 2]], quadUVs[split][:, [0, 2, 3]]))
+
+    polyVertices = np.concatenate((quads[~split].ravel(), tris.ravel()))
+    polyLoopTotal = np.concatenate((np.full((~split).sum(), 4), np.full(len(tris), 3))).astype(np.int32)
+    uvs = np.concatenate((quadUVs[~split].reshape(-1, 2), triUVs.reshape(-1, 2)))
+
+    numGroups = min(numGroups, rows)
+    groups = (r * numGroups // rows).astype(np.int32)
+    return {
+        "coords": coords,
+        "polyLoopTotal": polyLoopTotal,
+        "polyVertices": polyVertices.astype(np.int32),
+        "uvs": uvs.astype(np.float32),
+        "vertexGroupNames": dict((g, "group_%02d" % g) for g in range(numGroups)),
+        "membership": (np.arange(len(coords), dtype=np.int32), groups, np.ones(len(coords), dtype=np.float32))
+    }
+
+def syntheticPair(numVertices, numGroups):
+    """
+    human and a slightly wider, shorter piece of clothes with the same vertex groups
+    """
+    human = syntheticMesh(numVertices, numGroups, 1.0, 2.0, 0.0, 0.0)
+    clothes = syntheticMesh(numVertices, numGroups, 1.05, 1.6, 0.2, 0.37)
+    return (human, clothes)
@@ -0,0 +1,58 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# bulk formatting of the text written by the export (.obj and .mhclo), only numpy is used
+#
+# each block is formatted with one %-operation over a repeated or pre-joined format string
+#
+
+import numpy as np
+
+def _formatRows(fmt, rows):
+    """
+    format all rows of a 2d array with one format (containing one placeholder per column) in a single operation
+    """
+    return (fmt * len(rows)) % tuple(np.asarray(rows).ravel().tolist())
+
+def _formatFaces(fmt, polyStart, values):
+    """
+    create the "f" lines of a wavefront file, values contain one row per loop (in polygon order)
+    which is formatted with fmt, polyStart (P+1) determines the loops of each polygon
+    """
+    numLoops = int(polyStart[-1])
+    if numLoops == 0:
+        return ""
+    first = np.zeros(numLoops, dtype=bool)
+    first[polyStart[:-1][np.diff(polyStart) > 0]] = True
+    last = np.zeros(numLoops, dtype=bool)
+    last[polyStart[1:][np.diff(polyStart) > 0] - 1] = True
+
+    # each loop gets a prefix "f " when it starts a polygon and a space or a linefeed as suffix
+    #
+    pieces = np.where(first, "f " + fmt, fmt).astype(object) + np.where(last, "\n", " ").astype(object)
+    return "".join(pieces.tolist()) % tuple(np.asarray(values).ravel().tolist())
+
+def _formatDeleteVerts(indices):
+    """
+    text of the delete_verts section for the sorted vertex numbers, sequences are printed as "a - b",
+    after 8 columns (first line) or 9 columns a LF is inserted
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    if len(indices) == 0:
+        return ""
+
+    # a new run starts where the next number is not the successor
+    #
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    first = indices[np.concatenate(([0], breaks))]
+    last = indices[np.concatenate((breaks - 1, [len(indices) - 1]))]
+    single = first == last
+
+    column = np.arange(len(first)) % 9
+    fmt = np.where(column == 8, "\n", "").astype(object) + np.where(single, " %d", " %d - %d").astype(object)
+
+    values = np.column_stack((first, last))
+    used = np.ones(values.shape, dtype=bool)
+    used[single, 1] = False
+    return "".join(fmt.tolist()) % tuple(values[used].tolist())
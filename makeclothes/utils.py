@@ -9,6 +9,7 @@ import io
 import sys
 import bpy
 import inspect
+import numpy as np
 from addon_utils import check, paths, enable, modules
 
 # we need this for the standard obj-loader 
@@ -22,6 +23,15 @@ if bpy.app.version < (4,0,0):
 LEAST_REQUIRED_MAKESKIN_VERSION = (0,9,0)
 _TRACING = True
 
+def selectByMask(collection, mask):
+    """
+    select all elements of a collection (e.g. mesh.vertices or mesh.polygons) marked in a numpy boolean mask
+    in one pass, already selected elements stay selected
+    """
+    selected = np.zeros(len(collection), dtype=bool)
+    collection.foreach_get('select', selected)
+    collection.foreach_set('select', selected | mask)
+
 def getMyDocuments():
     import sys
     if sys.platform == 'win32':
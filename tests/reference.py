@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# test data and ports of the former per-vertex code of MakeClothes, the tests compare the array based code with them
+#
+
+import numpy as np
+
+from makeclothes.fitting import meshFromArrays
+
+def arraysMesh(synthetic, edges):
+    """
+    MeshArrays of a mesh created by makeclothes.synthetic, edges are needed for clothes
+    """
+    return meshFromArrays(synthetic["coords"], synthetic["polyLoopTotal"], synthetic["polyVertices"],
+            synthetic["vertexGroupNames"], synthetic["membership"], edges)
+
+def randomTriangles(rng, count, numVertices=500):
+    """
+    human coordinates (V,3), triangles (N,3) of well shaped random triangles and clothes points (N,3) near them
+    """
+    coords = rng.uniform(-1.0, 1.0, (numVertices, 3))
+    indices = np.zeros((0, 3), dtype=np.int64)
+    while len(indices) < count:
+        candidates = rng.integers(0, numVertices, (count, 3))
+        (A, B, C) = (coords[candidates[:, 0]], coords[candidates[:, 1]], coords[candidates[:, 2]])
+        area = 0.5 * np.linalg.norm(np.cross(B - A, C - A), axis=1)
+        indices = np.concatenate((indices, candidates[area > 0.05]))
+    indices = indices[:count]
+    corners = coords[indices]
+    points = corners.mean(axis=1) + rng.uniform(-0.2, 0.2, (count, 3))
+    return (coords, indices, points)
+
+def _normalized(V):
+    return V / np.sqrt(V.dot(V))
+
+def barycentricFitLoop(humanCoords, indices, points):
+    """
+    former loop of findWeightsAndDistances, one vertex after the other, numpy vectors replace mathutils.Vector
+    """
+    weights = np.zeros((len(points), 3))
+    offsets = np.zeros((len(points), 3))
+    for n in range(len(points)):
+        A = humanCoords[indices[n][0]]
+        B = humanCoords[indices[n][1]]
+        C = humanCoords[indices[n][2]]
+        Q = points[n]
+
+        # mathutils.geometry.normal(A, B, C)
+        #
+        N = _normalized(np.cross(A - B, B - C))
+
+        QA = Q - A
+        R = Q - N * QA.dot(N)
+
+        BA = _normalized(B - A)
+        NBA = _normalized(np.cross(N, BA))
+
+        AC = A - C
+        BC = B - C
+        RC = R - C
+
+        a00 = AC.dot(BA)
+        a01 = BC.dot(BA)
+        a10 = AC.dot(NBA)
+        a11 = BC.dot(NBA)
+        b0 = RC.dot(BA)
+        b1 = RC.dot(NBA)
+
+        det = a00*a11 - a01*a10
+
+        wa = (a11*b0 - a01*b1)/det
+        wb = (-a10*b0 + a00*b1)/det
+        wc = 1 - wa - wb
+
+        weights[n] = (wa, wb, wc)
+        offsets[n] = Q - (wa * A + wb * B + wc * C)
+    return (weights, offsets)
+
+class VertexMatch():
+
+    def __init__(self, clothesVertexIndex, clothesVertexX, clothesVertexY, clothesVertexZ):
+        """
+        former per-vertex match object of MakeClothes, replaced by VertexMatchTable
+        """
+        self.index = clothesVertexIndex
+        self.exactMatch = None
+        self.closestHumanVertexIndices = [-1, -1, -1]
+        self.weights = [0.0, 0.0, 0.0]
+        self.distance = [0.0, 0.0, 0.0]
+        self.x = clothesVertexX
+        self.y = clothesVertexY
+        self.z = clothesVertexZ
+        self.closestHumanVertexCoordinates = [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
+
+def vertexMatchObjects(coords, indices, weights, offsets, humanCoords):
+    """
+    the list of match objects the former code created for the clothes vertices coords
+    """
+    matches = []
+    for n in range(len(coords)):
+        (x, y, z) = coords[n].tolist()
+        match = VertexMatch(n, x, y, z)
+        match.closestHumanVertexIndices = indices[n].tolist()
+        match.weights = weights[n].tolist()
+        match.distance = offsets[n].tolist()
+        match.closestHumanVertexCoordinates = humanCoords[indices[n]].tolist()
+        matches.append(match)
+    return matches
+
+def bestFacesLoop(human, clothesCoords, table):
+    """
+    former loop of findBestFaces, one clothes vertex after the other
+    """
+    for n in table.nonExact().tolist():
+        closest = table.indices[n].tolist()
+        if any(closest[1] in human.polygonVertices(p) and closest[2] in human.polygonVertices(p) for p in human.vertexPolygons(closest[0])):
+            continue
+
+        scores = {}
+        for vertex in closest:
+            for face in human.vertexPolygons(vertex):
+                scores[face] = scores.get(face, 0) + 1
+        maxScore = max(scores.values())
+
+        bestFace = None
+        bestDistance = None
+        for (face, score) in scores.items():
+            if maxScore > 1 and score != maxScore:
+                continue
+            centroid = human.allVertexCoordinates[human.polygonVertices(face)].mean(axis=0)
+            distance = np.linalg.norm(centroid - clothesCoords[n])
+            if bestFace is None or distance < bestDistance:
+                (bestFace, bestDistance) = (face, distance)
+        table.indices[n] = human.polygonVertices(bestFace)[0:3]
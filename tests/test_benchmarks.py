@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# timings with pytest-benchmark, skipped if it is not installed:
+#
+# python -m pytest tests/test_benchmarks.py --benchmark-only
+#
+# complete exports on larger meshes are measured by makeclothes/benchmark.py
+#
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from makeclothes.fitting import VertexGroupTree, VertexMatchTable, fitClothes, findClosestVertices, findBestFaces, _barycentricFit
+from makeclothes.mhmesh import weldUVs
+from makeclothes.mhcloparser import readMhclo
+from makeclothes.parallel import fitClothesParallel
+from makeclothes.synthetic import syntheticMesh, syntheticPair
+from reference import arraysMesh, randomTriangles, barycentricFitLoop, bestFacesLoop, vertexMatchObjects
+
+@pytest.fixture(scope="module")
+def triangles():
+    return randomTriangles(np.random.default_rng(1), 5000, 20000)
+
+@pytest.mark.parametrize("fit", [barycentricFitLoop, _barycentricFit], ids=["loop", "numpy"])
+def test_barycentric_fit(benchmark, triangles, fit):
+    (weights, offsets) = benchmark(fit, *triangles)
+    assert len(weights) == len(triangles[1])
+
+def test_vertex_group_tree(benchmark):
+    # 13000 vertices on a sphere (the size of the body of hm08), clothes slightly outside
+    #
+    rng = np.random.default_rng(3)
+    coords = rng.normal(size=(13000, 3))
+    coords /= np.linalg.norm(coords, axis=1)[:, None]
+    points = rng.normal(size=(20000, 3))
+    points *= 1.05 / np.linalg.norm(points, axis=1)[:, None]
+    tree = VertexGroupTree(coords, np.arange(len(coords)))
+    (indices, distances) = benchmark(tree.query, points, 3)
+    assert indices.shape == (len(points), 3)
+
+def _allocated(create):
+    tracemalloc.start()
+    try:
+        result = create()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (result, size)
+
+def test_vertex_match_memory(benchmark):
+    # 100000 clothes vertices, former match objects against the columnar table
+    #
+    count = 100000
+    rng = np.random.default_rng(4)
+    humanCoords = rng.uniform(-1.0, 1.0, (20000, 3))
+    coords = rng.uniform(-1.0, 1.0, (count, 3))
+    indices = rng.integers(0, len(humanCoords), (count, 3))
+    weights = rng.uniform(0.0, 1.0, (count, 3))
+    offsets = rng.uniform(-0.1, 0.1, (count, 3))
+
+    def fillTable():
+        table = VertexMatchTable(count)
+        table.indices[:] = indices
+        table.weights[:] = weights
+        table.offsets[:] = offsets
+        return table
+
+    (matches, objectBytes) = _allocated(lambda: vertexMatchObjects(coords, indices, weights, offsets, humanCoords))
+    del matches
+    (table, tableBytes) = _allocated(fillTable)
+    benchmark.extra_info["objects bytes per vertex"] = objectBytes / count
+    benchmark.extra_info["table bytes per vertex"] = tableBytes / count
+    assert tableBytes * 4 < objectBytes
+
+    benchmark(fillTable)
+
+@pytest.fixture(scope="module", params=[10000, 100000])
+def cylinder(request):
+    return syntheticMesh(request.param, 8, 1.0, 2.0, 0.0, 0.0)
+
+@pytest.fixture(scope="module", params=[1000, 10000])
+def pair(request):
+    return syntheticPair(request.param, 8)
+
+def test_weld_uvs(benchmark, cylinder):
+    benchmark(weldUVs, cylinder["polyVertices"], cylinder["uvs"])
+
+def test_mesh_from_arrays(benchmark, cylinder):
+    benchmark(arraysMesh, cylinder, True)
+
+@pytest.mark.parametrize("mode", ["VERTEX", "SURFACE"])
+def test_fit_clothes(benchmark, pair, mode):
+    # the quality is the mean length of the offsets, the distance of the clothes to the plane of the chosen human face
+    #
+    (human, clothes) = (arraysMesh(pair[0], False), arraysMesh(pair[1], True))
+    (b, text, table, isTriangle) = benchmark(fitClothes, human, clothes, mode=mode)
+    assert b, text
+    benchmark.extra_info["mean offset"] = float(np.linalg.norm(table.offsets, axis=1).mean())
+
+@pytest.mark.parametrize("loop", [True, False], ids=["loop", "numpy"])
+def test_best_faces(benchmark, loop):
+    # the table of the closest vertices is copied before each round, the rows changed once are not changed again
+    #
+    (humanData, clothesData) = syntheticPair(20000, 8)
+    (human, clothes) = (arraysMesh(humanData, False), arraysMesh(clothesData, True))
+    closest = VertexMatchTable(len(clothes.allVertexCoordinates))
+    findClosestVertices(human, clothes, closest)
+
+    def setup():
+        table = VertexMatchTable(len(closest))
+        table.indices[:] = closest.indices
+        return ((table,), {})
+
+    if loop:
+        benchmark.pedantic(lambda table: bestFacesLoop(human, clothes.allVertexCoordinates, table), setup=setup, rounds=3)
+    else:
+        benchmark.pedantic(lambda table: findBestFaces(human, clothes, table), setup=setup, rounds=10)
+
+def test_format_and_parse(benchmark, pair, tmp_path):
+    (human, clothes) = (arraysMesh(pair[0], False), arraysMesh(pair[1], True))
+    (b, text, table, isTriangle) = fitClothes(human, clothes)
+    filename = str(tmp_path / "benchmark.mhclo")
+
+    def formatAndParse():
+        with open(filename, "w") as f:
+            f.write("verts 0\n" + table.formatLines(0, len(table)))
+        return readMhclo(filename)
+
+    data = benchmark(formatAndParse)
+    assert len(data.indices) == len(table)
+
+@pytest.mark.parametrize("workers", [1, 2, 4, 8])
+def test_fit_workers(benchmark, workers):
+    # the same 8 pieces of clothes with each number of processes, one process is the serial fitting,
+    # the start of the worker processes is included
+    #
+    (humanData, clothesData) = syntheticPair(3000, 8)
+    human = arraysMesh(humanData, False)
+    clothesList = [arraysMesh(clothesData, True) for n in range(8)]
+    results = benchmark.pedantic(fitClothesParallel, args=(human, clothesList, workers), rounds=2)
+    assert all(b for (b, text, table, isTriangle) in results)
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from makeclothes.mhmesh import keptMesh, edgeSource, groupWeightSets
+from makeclothes.synthetic import syntheticMesh
+
+def _meshArrays(rng):
+    """
+    edges and loops of a synthetic mesh like blender stores them, the polygons are not in loop order
+    """
+    data = syntheticMesh(500, 4, 1.0, 2.0, 0.0, 0.0)
+    loopTotal = data["polyLoopTotal"]
+    polyVertices = data["polyVertices"]
+    polyStart = np.cumsum(loopTotal) - loopTotal
+    pairs = np.column_stack((polyVertices, np.roll(polyVertices, -1)))
+    pairs[np.cumsum(loopTotal) - 1, 1] = polyVertices[polyStart]
+    edgeVertices = np.unique(np.sort(pairs, axis=1), axis=0)
+
+    order = rng.permutation(len(loopTotal))
+    loopStart = np.zeros(len(loopTotal), dtype=np.int64)
+    loopStart[order] = np.cumsum(loopTotal[order]) - loopTotal[order]
+    loopVertices = np.zeros(len(polyVertices), dtype=np.int32)
+    for p in range(len(loopTotal)):
+        loopVertices[loopStart[p]:loopStart[p] + loopTotal[p]] = polyVertices[polyStart[p]:polyStart[p] + loopTotal[p]]
+    return (len(data["coords"]), edgeVertices, loopStart, loopTotal, loopVertices)
+
+def test_kept_mesh_same_as_loop():
+    rng = np.random.default_rng(0)
+    (numVertices, edgeVertices, loopStart, loopTotal, loopVertices) = _meshArrays(rng)
+    keep = rng.uniform(size=numVertices) < 0.8
+    (newIndex, keepEdges, newEdgeVertices, loops, keepPolygons, newLoopTotal) = keptMesh(keep, edgeVertices, loopStart, loopTotal, loopVertices)
+
+    expectedLoops = []
+    expectedPolygons = []
+    for p in range(len(loopTotal)):
+        polygonLoops = list(range(loopStart[p], loopStart[p] + loopTotal[p]))
+        if all(keep[loopVertices[n]] for n in polygonLoops):
+            expectedPolygons.append(p)
+            expectedLoops += polygonLoops
+    assert 0 < len(expectedPolygons) < len(loopTotal)
+    assert keepPolygons.tolist() == expectedPolygons
+    assert loops.tolist() == expectedLoops
+    assert newLoopTotal.tolist() == loopTotal[expectedPolygons].tolist()
+
+    kept = np.flatnonzero(keep)
+    assert newIndex[kept].tolist() == list(range(len(kept)))
+    assert (newIndex[~keep] == -1).all()
+    assert keepEdges.tolist() == [e for e in range(len(edgeVertices)) if keep[edgeVertices[e]].all()]
+    assert np.array_equal(kept[newEdgeVertices], edgeVertices[keepEdges])
+
+def test_kept_mesh_nothing_kept():
+    rng = np.random.default_rng(1)
+    (numVertices, edgeVertices, loopStart, loopTotal, loopVertices) = _meshArrays(rng)
+    (newIndex, keepEdges, newEdgeVertices, loops, keepPolygons, newLoopTotal) = keptMesh(np.zeros(numVertices, dtype=bool),
+            edgeVertices, loopStart, loopTotal, loopVertices)
+    assert len(keepEdges) == len(loops) == len(keepPolygons) == 0
+
+def test_edge_source():
+    # the new edges in another order and direction, one edge is new
+    #
+    rng = np.random.default_rng(2)
+    sourceVertices = np.unique(np.sort(rng.integers(0, 200, (500, 2)), axis=1), axis=0)
+    sourceVertices = sourceVertices[sourceVertices[:, 0] != sourceVertices[:, 1]]
+    sourceEdges = rng.permutation(1000)[:len(sourceVertices)]
+
+    order = rng.permutation(len(sourceVertices))
+    newEdges = sourceVertices[order]
+    flip = rng.uniform(size=len(newEdges)) < 0.5
+    newEdges[flip] = newEdges[flip][:, ::-1]
+    newEdges = np.concatenate((newEdges, [[199, 200]]))
+
+    source = edgeSource(sourceVertices, sourceEdges, newEdges, 201)
+    assert source[:-1].tolist() == sourceEdges[order].tolist()
+    assert source[-1] == -1
+    assert edgeSource(np.zeros((0, 2), dtype=np.int32), [], newEdges, 201).tolist() == [-1] * len(newEdges)
+
+def test_group_weight_sets():
+    rng = np.random.default_rng(3)
+    groups = rng.integers(0, 5, 1000)
+    weights = rng.choice(np.array([1.0, 0.5, 0.25], dtype=np.float32), 1000)
+    (setGroups, setWeights, start, assignments) = groupWeightSets(groups, weights)
+
+    assert len(setGroups) == len(set(zip(groups.tolist(), weights.tolist())))
+    assert sorted(assignments.tolist()) == list(range(1000))
+    for n in range(len(setGroups)):
+        members = assignments[start[n]:start[n + 1]]
+        assert len(members) > 0
+        assert (groups[members] == setGroups[n]).all()
+        assert (weights[members] == setWeights[n]).all()
+    assert len(groupWeightSets(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))[0]) == 0
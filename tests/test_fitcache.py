@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import copy
+import io
+import numpy as np
+import pytest
+
+from makeclothes.fitting import fitClothes
+from makeclothes.fitcache import readFitCache, writeFitCache
+from makeclothes.synthetic import syntheticPair
+from reference import arraysMesh
+
+@pytest.fixture(scope="module")
+def meshes():
+    (humanData, clothesData) = syntheticPair(3000, 4)
+    return (arraysMesh(humanData, False), arraysMesh(clothesData, True))
+
+def _writeCache(tmp_path, human, clothes, mode):
+    filename = str(tmp_path / "clothes.fitcache.npz")
+    (b, text, table, isTriangle) = fitClothes(human, clothes, mode=mode)
+    assert b, text
+    assert writeFitCache(filename, human, clothes, table, isTriangle, mode) == (True, "")
+    return (filename, table)
+
+@pytest.mark.parametrize("mode", ["VERTEX", "SURFACE"])
+def test_round_trip(meshes, tmp_path, mode):
+    (human, clothes) = meshes
+    (filename, table) = _writeCache(tmp_path, human, clothes, mode)
+
+    # nothing changed, the cached table is used as it is
+    #
+    (cached, isTriangle, rows) = readFitCache(filename, human, clothes, mode)
+    assert len(rows) == 0
+    for name in ("indices", "weights", "offsets", "exact"):
+        assert np.array_equal(getattr(cached, name), getattr(table, name))
+
+    # moved vertices, fitting only the rows gives the same result as fitting everything
+    #
+    moved = copy.deepcopy(clothes)
+    moved.allVertexCoordinates[::75] += (0.01, -0.02, 0.005)
+    (cached, isTriangle, rows) = readFitCache(filename, human, moved, mode)
+    assert 0 < len(rows) < len(cached)
+    (b, text, refitted, isTriangle) = fitClothes(human, moved, mode=mode, table=cached, rows=rows)
+    (b, text, expected, isTriangle) = fitClothes(human, moved, mode=mode)
+    for name in ("indices", "weights", "offsets", "exact"):
+        assert np.array_equal(getattr(refitted, name), getattr(expected, name))
+
+def test_neighbors_fitted_again(meshes, tmp_path):
+    (human, clothes) = meshes
+    (filename, table) = _writeCache(tmp_path, human, clothes, "VERTEX")
+    moved = copy.deepcopy(clothes)
+    vertex = 1234
+    moved.allVertexCoordinates[vertex] += (0.0, 0.0, 0.01)
+    (cached, isTriangle, rows) = readFitCache(filename, human, moved, "VERTEX")
+    assert sorted(rows.tolist()) == sorted([vertex] + list(clothes.vertexNeighbors(vertex)))
+
+def test_changed_input_is_a_miss(meshes, tmp_path):
+    (human, clothes) = meshes
+    (filename, table) = _writeCache(tmp_path, human, clothes, "VERTEX")
+    assert readFitCache(filename, human, clothes, "SURFACE") is None
+
+    changed = copy.deepcopy(human)
+    changed.allVertexCoordinates[0] += (0.0, 0.0, 0.001)
+    assert readFitCache(filename, changed, clothes, "VERTEX") is None
+    assert readFitCache(str(tmp_path / "missing.fitcache.npz"), human, clothes, "VERTEX") is None
+
+def test_corrupt_file_is_a_miss(meshes, tmp_path):
+    (human, clothes) = meshes
+    (filename, table) = _writeCache(tmp_path, human, clothes, "VERTEX")
+    with open(filename, "rb") as f:
+        content = f.read()
+
+    # truncated, no zip archive at all, an archive with other keys and one with wrong shapes
+    #
+    with open(filename, "wb") as f:
+        f.write(content[:len(content) // 2])
+    assert readFitCache(filename, human, clothes, "VERTEX") is None
+
+    with open(filename, "wb") as f:
+        f.write(b"PK\x03\x04 this is not a cache")
+    assert readFitCache(filename, human, clothes, "VERTEX") is None
+
+    with open(filename, "wb") as f:
+        np.savez(f, something=np.arange(10))
+    assert readFitCache(filename, human, clothes, "VERTEX") is None
+
+    with np.load(io.BytesIO(content)) as cache:
+        data = dict(cache.items())
+    data["indices"] = data["indices"][:10]
+    with open(filename, "wb") as f:
+        np.savez(f, **data)
+    assert readFitCache(filename, human, clothes, "VERTEX") is None
@@ -0,0 +1,190 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import copy
+import numpy as np
+import pytest
+
+from makeclothes.fitting import meshFromArrays, VertexGroupTree, VertexMatchTable, fitClothes, findClosestVertices, findBestFaces, \
+        _barycentricFit, _closestPointOnTriangles
+from makeclothes.synthetic import syntheticPair
+from reference import arraysMesh, randomTriangles, barycentricFitLoop, bestFacesLoop
+
+@pytest.fixture(scope="module")
+def meshes():
+    (humanData, clothesData) = syntheticPair(3000, 4)
+    return (arraysMesh(humanData, False), arraysMesh(clothesData, True))
+
+def _rebuild(human, table):
+    """
+    clothes coordinates calculated back from the table (scales 1.0), like the import does
+    """
+    return np.einsum('ij,ijk->ik', table.weights, human.allVertexCoordinates[table.indices]) + table.offsets
+
+def test_barycentric_fit_same_as_loop():
+    (coords, indices, points) = randomTriangles(np.random.default_rng(0), 2000)
+    (weights, offsets) = _barycentricFit(coords, indices, points)
+    (expectedWeights, expectedOffsets) = barycentricFitLoop(coords, indices, points)
+    assert np.allclose(weights, expectedWeights, rtol=0.0, atol=1e-6)
+    assert np.allclose(offsets, expectedOffsets, rtol=0.0, atol=1e-6)
+
+def test_barycentric_fit_point_in_plane():
+    # a point inside the triangle has no offset, the weights are its barycentric coordinates
+    #
+    coords = np.array([[0.0, 0.0, 0.0], [2.0, 0.0, 0.0], [0.0, 2.0, 0.0]])
+    (weights, offsets) = _barycentricFit(coords, np.array([[0, 1, 2]]), np.array([[0.5, 0.5, 0.0]]))
+    assert np.allclose(weights, [[0.5, 0.25, 0.25]])
+    assert np.allclose(offsets, 0.0)
+
+    # above the plane the offset is the distance along the normal
+    #
+    (weights, offsets) = _barycentricFit(coords, np.array([[0, 1, 2]]), np.array([[0.5, 0.5, 0.3]]))
+    assert np.allclose(weights, [[0.5, 0.25, 0.25]])
+    assert np.allclose(offsets, [[0.0, 0.0, 0.3]])
+
+def test_vertex_group_tree_same_as_sorting():
+    # vertices on a sphere, points inside, near the surface and far outside of the grid
+    #
+    rng = np.random.default_rng(2)
+    coords = rng.normal(size=(3000, 3))
+    coords /= np.linalg.norm(coords, axis=1)[:, None]
+    points = np.concatenate((rng.normal(size=(500, 3)) * 0.3, coords[:500] * 1.02, rng.normal(size=(50, 3)) * 20.0))
+    tree = VertexGroupTree(coords, np.arange(len(coords)) + 100)
+
+    squared = ((points[:, None, :] - coords[None, :, :]) ** 2).sum(axis=2)
+    for n in (1, 3, 16):
+        (indices, distances) = tree.query(points, n)
+        assert np.allclose(distances, np.sqrt(np.sort(squared, axis=1)[:, :n]))
+        assert np.allclose(np.sqrt(np.take_along_axis(squared, indices - 100, axis=1)), distances)
+
+def test_vertex_group_tree_wide_rings(monkeypatch):
+    # points some cells away from a dense sheet are found with more rings, not by comparing all vertices
+    #
+    rng = np.random.default_rng(3)
+    coords = np.column_stack((rng.uniform(size=(20000, 2)), rng.normal(size=20000) * 0.001))
+    points = np.column_stack((rng.uniform(size=(300, 2)), np.full(300, 0.08)))
+    tree = VertexGroupTree(coords, np.arange(len(coords)))
+    if tree._tree is not None:
+        pytest.skip("scipy is used")
+    monkeypatch.setattr(VertexGroupTree, "_bruteForce", None)
+
+    squared = ((points[:, None, :] - coords[None, :, :]) ** 2).sum(axis=2)
+    (indices, distances) = tree.query(points, 16)
+    assert np.allclose(distances, np.sqrt(np.sort(squared, axis=1)[:, :16]))
+
+def _lineReference(table, n):
+    """
+    former str() of a per-vertex match
+    """
+    if table.exact[n] < 0:
+        (v1, v2, v3) = table.indices[n].tolist()
+        (w1, w2, w3) = table.weights[n].tolist()
+        (dx, dy, dz) = table.offsets[n].tolist()
+        return "%d %d %d %.4f %.4f %.4f %.4f %.4f %.4f" % (v1, v2, v3, w1, w2, w3, dx, dz, -dy)
+    else:
+        return str(table.exact[n])
+
+def test_format_lines():
+    table = VertexMatchTable(3)
+    table.exact[1] = 42
+    table.indices[0] = (1, 2, 3)
+    table.weights[0] = (0.5, 0.25, 0.25)
+    table.offsets[0] = (0.1, 0.2, -0.3)
+    table.indices[2] = (4, 5, 6)
+    table.weights[2] = (1.0, 0.0, 0.0)
+    assert table.nonExact().tolist() == [0, 2]
+    assert table.formatLines(0, 3) == "1 2 3 0.5000 0.2500 0.2500 0.1000 -0.3000 -0.2000\n42\n" \
+            "4 5 6 1.0000 0.0000 0.0000 0.0000 0.0000 -0.0000\n"
+    assert table.formatLines(1, 2) == "42\n"
+
+def test_format_lines_same_as_loop():
+    rng = np.random.default_rng(5)
+    table = VertexMatchTable(1000)
+    table.indices[:] = rng.integers(0, 20000, (1000, 3))
+    table.weights[:] = rng.uniform(-0.5, 1.5, (1000, 3))
+    table.offsets[:] = rng.uniform(-0.1, 0.1, (1000, 3))
+    exact = rng.uniform(size=1000) < 0.3
+    table.exact[exact] = rng.integers(0, 20000, exact.sum())
+    expected = "".join(_lineReference(table, n) + "\n" for n in range(len(table)))
+    assert "".join(table.formatLines(start, start + 300) for start in range(0, len(table), 300)) == expected
+
+def test_best_faces_same_as_loop(meshes):
+    (human, clothes) = meshes
+    table = VertexMatchTable(len(clothes.allVertexCoordinates))
+    (b, text, isTriangle) = findClosestVertices(human, clothes, table)
+    assert b, text
+    closest = table.indices.copy()
+    reference = copy.deepcopy(table)
+
+    # a part of the rows is changed, all of them like in the loop
+    #
+    findBestFaces(human, clothes, table)
+    bestFacesLoop(human, clothes.allVertexCoordinates, reference)
+    assert (table.indices != closest).any()
+    assert np.array_equal(table.indices, reference.indices)
+
+def test_fit_vertex(meshes):
+    (human, clothes) = meshes
+    (b, text, table, isTriangle) = fitClothes(human, clothes, mode="VERTEX")
+    assert b, text
+    assert isTriangle is False
+    assert (table.indices >= 0).all()
+
+    # the three vertices of each match belong to one face of the human
+    #
+    for n in range(0, len(table), 7):
+        (a, b, c) = table.indices[n].tolist()
+        assert any(b in human.polygonVertices(p) and c in human.polygonVertices(p) for p in human.vertexPolygons(a))
+
+    assert np.allclose(table.weights.sum(axis=1), 1.0)
+    assert np.allclose(_rebuild(human, table), clothes.allVertexCoordinates)
+
+def test_fit_surface(meshes):
+    (human, clothes) = meshes
+    (b, text, table, isTriangle) = fitClothes(human, clothes, mode="SURFACE")
+    assert b, text
+    assert np.allclose(_rebuild(human, table), clothes.allVertexCoordinates)
+
+    # the triangle found is the closest of all triangles of the group
+    #
+    coords = human.allVertexCoordinates
+    for (groupIndex, groupName) in clothes.vertexGroupNames.items():
+        (triangles, tree, radius) = human.vertexGroupTriangles(groupName)
+        for n in clothes.vertexGroupVertices[groupIndex][::11].tolist():
+            P = np.repeat(clothes.allVertexCoordinates[n][None, :], len(triangles), axis=0)
+            closest = _closestPointOnTriangles(P, coords[triangles[:, 0]], coords[triangles[:, 1]], coords[triangles[:, 2]])
+            best = np.linalg.norm(closest - P, axis=1).min()
+
+            tri = table.indices[n]
+            found = _closestPointOnTriangles(P[:1], coords[tri[None, 0]], coords[tri[None, 1]], coords[tri[None, 2]])
+            assert np.isclose(np.linalg.norm(found[0] - P[0]), best)
+
+def test_exact_match(meshes):
+    (human, clothes) = meshes
+    clothes = copy.deepcopy(clothes)
+    target = human.vertexGroupVertices[0][5]
+    vertex = clothes.vertexGroupVertices[0][0]
+    clothes.allVertexCoordinates[vertex] = human.allVertexCoordinates[target]
+    for mode in ("VERTEX", "SURFACE"):
+        (b, text, table, isTriangle) = fitClothes(human, clothes, mode=mode)
+        assert table.exact[vertex] == target
+        assert table.formatLines(vertex, vertex + 1) == "%d\n" % target
+
+def test_mesh_from_arrays_copies_coordinates():
+    (humanData, clothesData) = syntheticPair(1000, 4)
+    original = clothesData["coords"].copy()
+    clothes = arraysMesh(clothesData, True)
+    clothes.allVertexCoordinates[::10] += (0.0, 0.0, 0.001)
+    assert np.array_equal(clothesData["coords"], original)
+
+def test_mesh_from_arrays_indices():
+    # two quads sharing the edge 1-4
+    #
+    mesh = meshFromArrays(np.zeros((6, 3)), [4, 4], [0, 1, 4, 3, 1, 2, 5, 4], {0: "all"}, (np.arange(6), np.zeros(6), np.ones(6)))
+    assert mesh.polyStart.tolist() == [0, 4, 8]
+    assert mesh.vertexPolygons(1) == [0, 1]
+    assert mesh.vertexPolygons(0) == [0]
+    assert sorted(mesh.vertexNeighbors(4)) == [1, 3, 5]
+    assert mesh.max_poles == 3
+    assert len(mesh.edgeVertices) == 7
+    assert mesh.vertexGroupVertices[0].tolist() == list(range(6))
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from makeclothes.fitting import VertexMatchTable
+from makeclothes.mhcloparser import readMhclo, _parseVerts
+
+def _write(tmp_path, text):
+    filename = tmp_path / "test.mhclo"
+    filename.write_text(text)
+    return str(filename)
+
+def test_verts(tmp_path):
+    data = readMhclo(_write(tmp_path, "name test\nverts 0\n7\n1 2 3 0.5 0.25 0.25 0.1 0.2 0.3\n"))
+    assert data.name == "test"
+    assert data.indices.tolist() == [[7, 7, 7], [1, 2, 3]]
+    assert data.weights.tolist() == [[1, 0, 0], [0.5, 0.25, 0.25]]
+
+    # offsets are converted to blender order (dx, -dz, dy)
+    #
+    assert np.allclose(data.offsets, [[0, 0, 0], [0.1, -0.3, 0.2]])
+
+@pytest.mark.parametrize("count", [2, 5, 8])
+def test_short_verts_line(count):
+    short = " ".join(["1"] * count)
+    with pytest.raises(ValueError):
+        _parseVerts([short, "4 5 6 0.2 0.3 0.5 0.0 0.0 0.0"], [count, 9])
+
+def test_short_verts_line_in_file(tmp_path):
+    with pytest.raises(ValueError):
+        readMhclo(_write(tmp_path, "verts 0\n1 2 3 0.5 0.5\n4 5 6 0.2 0.3 0.5 0.0 0.0 0.0\n"))
+
+def test_round_trip(tmp_path):
+    # the verts section written by the export is read back with 4 decimals
+    #
+    rng = np.random.default_rng(6)
+    table = VertexMatchTable(500)
+    table.indices[:] = rng.integers(0, 20000, (500, 3))
+    table.weights[:] = rng.uniform(0.0, 1.0, (500, 3))
+    table.offsets[:] = rng.uniform(-0.1, 0.1, (500, 3))
+    exact = rng.uniform(size=500) < 0.3
+    table.exact[exact] = rng.integers(0, 20000, exact.sum())
+
+    data = readMhclo(_write(tmp_path, "verts 0\n" + table.formatLines(0, len(table))))
+    assert (data.indices[exact] == table.exact[exact][:, None]).all()
+    assert (data.indices[~exact] == table.indices[~exact]).all()
+    assert np.allclose(data.weights[~exact], table.weights[~exact], atol=5e-5)
+    assert np.allclose(data.offsets[~exact], table.offsets[~exact], atol=5e-5)
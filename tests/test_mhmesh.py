@@ -0,0 +1,67 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#
+# the group membership is read from simple objects with the same attributes as blender objects
+#
+
+from types import SimpleNamespace
+import numpy as np
+
+from makeclothes.mhmesh import vertexGroupMembership, rangeMembership, verifyRangeMembership
+
+def _object(groupNames, assignments, numVertices):
+    """
+    assignments: dict vertex number => list of (group index, weight)
+    """
+    vertices = []
+    for index in range(numVertices):
+        groups = [SimpleNamespace(group=g, weight=w) for (g, w) in assignments.get(index, [])]
+        vertices.append(SimpleNamespace(index=index, groups=groups))
+    vertexGroups = [SimpleNamespace(name=name, index=index) for (index, name) in enumerate(groupNames)]
+    return SimpleNamespace(data=SimpleNamespace(vertices=vertices), vertex_groups=vertexGroups)
+
+_CONFIG = { "vertices": 10, "groups_by_range": { "body": [0, 5], "helper": [6, 7] } }
+
+def _assignments(extra):
+    assignments = dict((v, [(0, 1.0)]) for v in range(6))
+    assignments.update((v, [(1, 1.0)]) for v in (6, 7))
+    for (v, g, w) in extra:
+        assignments.setdefault(v, []).append((g, w))
+    return assignments
+
+def _sorted(membership):
+    return sorted(zip(*[m.tolist() for m in membership]))
+
+def test_same_groups():
+    obj = _object(["body", "helper"], _assignments([]), 10)
+    assert _sorted(rangeMembership(obj, _CONFIG)) == _sorted(vertexGroupMembership(obj.data))
+
+def test_additional_groups_are_read():
+    # vertices 8 and 9 are in no range (like the ground joint of hm08), a delete group on the body
+    #
+    extra = [(8, 2, 1.0), (9, 2, 1.0), (6, 3, 1.0), (7, 3, 1.0), (8, 3, 1.0), (2, 4, 0.5), (3, 4, 1.0)]
+    obj = _object(["body", "helper", "joint-ground", "HelperGeometry", "delete"], _assignments(extra), 10)
+    membership = vertexGroupMembership(obj.data)
+    ranges = rangeMembership(obj, _CONFIG)
+    assert _sorted(ranges) == _sorted(membership)
+    assert (np.diff(ranges[0]) >= 0).all()
+    assert verifyRangeMembership(obj, membership, ranges, _CONFIG) == (True, [])
+
+def test_skip():
+    obj = _object(["body", "helper"], _assignments([]), 10)
+    (verts, groups, weights) = vertexGroupMembership(obj.data, skip=[0])
+    assert verts.tolist() == [6, 7]
+
+def test_missing_group_or_other_size():
+    obj = _object(["body"], _assignments([]), 10)
+    assert rangeMembership(obj, _CONFIG) is None
+    obj = _object(["body", "helper"], _assignments([]), 11)
+    assert rangeMembership(obj, _CONFIG) is None
+
+def test_verify_finds_changed_group():
+    assignments = _assignments([])
+    assignments[5] = [(1, 1.0)]
+    obj = _object(["body", "helper"], assignments, 10)
+    ranges = rangeMembership(obj, _CONFIG)
+    assert verifyRangeMembership(obj, vertexGroupMembership(obj.data), ranges, _CONFIG) == (False, ["body", "helper"])
@@ -0,0 +1,27 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from makeclothes.fitting import fitClothes
+from makeclothes.parallel import fitClothesParallel
+from makeclothes.synthetic import syntheticMesh
+from reference import arraysMesh
+
+@pytest.mark.parametrize("mode", ["VERTEX", "SURFACE"])
+def test_parallel_same_as_serial(mode):
+    # three different pieces of clothes on the same human, fitted in two processes
+    #
+    human = arraysMesh(syntheticMesh(3000, 4, 1.0, 2.0, 0.0, 0.0), False)
+    clothesList = [arraysMesh(syntheticMesh(2000 + 500 * n, 4, 1.05 + 0.02 * n, 1.6, 0.2, 0.37 * n), True) for n in range(3)]
+
+    results = fitClothesParallel(human, clothesList, workers=2, mode=mode)
+    assert len(results) == len(clothesList)
+    for (clothes, (b, text, table, isTriangle)) in zip(clothesList, results):
+        (expectedB, expectedText, expected, expectedTriangle) = fitClothes(human, clothes, mode=mode)
+        assert (b, text, isTriangle) == (expectedB, expectedText, expectedTriangle)
+        assert np.array_equal(table.exact, expected.exact)
+        assert np.array_equal(table.indices, expected.indices)
+        assert np.array_equal(table.weights, expected.weights)
+        assert np.array_equal(table.offsets, expected.offsets)
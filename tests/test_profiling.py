@@ -0,0 +1,44 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import json
+import tracemalloc
+
+from makeclothes.profiling import StageProfiler, lastProfile
+
+def test_disabled_profiler_measures_nothing():
+    profiler = StageProfiler()
+    with profiler.stage("fitting"):
+        pass
+    assert profiler.stage("writing") is profiler.stage("fitting")
+    assert profiler.results() == {}
+
+def test_stages_are_summed_up(tmp_path):
+    profiler = StageProfiler(enabled=True)
+    for n in range(3):
+        with profiler.stage("fitting"):
+            pass
+    with profiler.stage("writing"):
+        pass
+    profiler.stop()
+
+    results = profiler.results()
+    assert list(results.keys()) == ["fitting", "writing"]
+    assert results["fitting"]["calls"] == 3
+    assert "peak" not in results["fitting"]
+    assert lastProfile() == results
+    assert "fitting: " in profiler.infoText() and "(3 calls)" in profiler.infoText()
+
+    filename = str(tmp_path / "clothes.profile.json")
+    assert profiler.writeJson(filename) == (True, "")
+    with open(filename) as f:
+        assert json.load(f) == results
+
+def test_memory_peak():
+    profiler = StageProfiler(enabled=True, memory=True)
+    with profiler.stage("allocate"):
+        data = bytearray(4000000)
+    del data
+    profiler.stop()
+    assert profiler.results()["allocate"]["peak"] >= 4000000
+    assert not tracemalloc.is_tracing()
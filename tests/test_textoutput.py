@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from makeclothes.textoutput import _formatRows, _formatFaces, _formatDeleteVerts
+from makeclothes.mhcloparser import _parseDeleteVerts
+
+def _objReference(coords, polyStart, polyVertices, texVerts, uvFaceVerts):
+    """
+    former loops of writeObj, one line after the other
+    """
+    output = ""
+    for v in coords:
+        output += "v %.4f %.4f %.4f\n" % (v[0], v[2], -v[1])
+    if texVerts is not None:
+        for uv in texVerts:
+            output += "vt %.4f %.4f\n" % (uv[0], uv[1])
+    for p in range(len(polyStart) - 1):
+        line = ["f"]
+        for n in range(polyStart[p], polyStart[p + 1]):
+            if texVerts is not None:
+                line.append("%d/%d" % (polyVertices[n] + 1, uvFaceVerts[n] + 1))
+            else:
+                line.append("%d" % (polyVertices[n] + 1))
+        output += " ".join(line) + "\n"
+    return output
+
+def _objText(coords, polyStart, polyVertices, texVerts, uvFaceVerts):
+    output = _formatRows("v %.4f %.4f %.4f\n", np.column_stack((coords[:, 0], coords[:, 2], -coords[:, 1])))
+    if texVerts is not None:
+        output += _formatRows("vt %.4f %.4f\n", texVerts)
+        output += _formatFaces("%d/%d", polyStart, np.column_stack((polyVertices + 1, uvFaceVerts + 1)))
+    else:
+        output += _formatFaces("%d", polyStart, polyVertices + 1)
+    return output
+
+def test_obj_same_as_loop():
+    # mixed triangles, quads and ngons, small values give -0.0000
+    #
+    rng = np.random.default_rng(0)
+    coords = rng.uniform(-1.0, 1.0, (300, 3))
+    coords[:20] *= 1e-6
+    polyStart = np.concatenate(([0], np.cumsum(rng.integers(3, 7, 200))))
+    polyVertices = rng.integers(0, len(coords), polyStart[-1])
+    texVerts = rng.uniform(0.0, 1.0, (400, 2)).astype(np.float32)
+    uvFaceVerts = rng.integers(0, len(texVerts), polyStart[-1])
+    for uv in ((texVerts, uvFaceVerts), (None, None)):
+        assert _objText(coords, polyStart, polyVertices, *uv) == _objReference(coords, polyStart, polyVertices, *uv)
+
+def _deleteVertsReference(indices):
+    """
+    former loop of evaluateDeleteVertices
+    """
+    output = ""
+    lastindex = -2
+    cnt = 0
+    column = 0
+    for index in indices:
+        if lastindex + 1 != index:
+            if cnt > 1:
+                output += " - " + str(lastindex)
+            column += 1
+            if column > 8:
+                column = 0
+                output += "\n"
+            output += " " + str(index)
+            cnt = 1
+        else:
+            cnt += 1
+        lastindex = index
+    if cnt > 1:
+        output += " - " + str(lastindex)
+    return output
+
+def _randomGroup(rng, startAtZero):
+    """
+    sorted vertex numbers as runs of random length with random gaps
+    """
+    runs = []
+    first = 0 if startAtZero else int(rng.integers(1, 50))
+    for n in range(int(rng.integers(1, 40))):
+        length = int(rng.integers(1, 6))
+        runs.append(np.arange(first, first + length))
+        first += length + int(rng.integers(2, 30))
+    return np.concatenate(runs)
+
+@pytest.mark.parametrize("seed", range(50))
+def test_delete_verts_round_trip(seed):
+    rng = np.random.default_rng(seed)
+    indices = _randomGroup(rng, seed % 2 == 0)
+    text = _formatDeleteVerts(indices)
+    assert text == _deleteVertsReference(indices.tolist())
+    assert _parseDeleteVerts(text.split()).tolist() == indices.tolist()
+
+def test_delete_verts_run_across_line_break():
+    # the 9th run starts the second line, the 18th the third one, these runs are ranges
+    #
+    indices = np.concatenate([np.arange(n * 10, n * 10 + (4 if n in (8, 17) else 1)) for n in range(20)])
+    text = _formatDeleteVerts(indices)
+    lines = text.split("\n")
+    assert len(lines) == 3
+    assert lines[1].startswith(" 80 - 83")
+    assert lines[2].startswith(" 170 - 173")
+    assert _parseDeleteVerts(text.split()).tolist() == indices.tolist()
+
+def test_delete_verts_from_zero():
+    indices = np.array([0, 1, 2, 5, 7, 8])
+    assert _formatDeleteVerts(indices) == " 0 - 2 5 7 - 8"
+    assert _parseDeleteVerts(_formatDeleteVerts(indices).split()).tolist() == indices.tolist()
+
+def test_delete_verts_empty():
+    assert _formatDeleteVerts(np.zeros(0, dtype=np.int64)) == ""
+
+def test_format_rows():
+    assert _formatRows("v %.4f %.4f\n", np.array([[1.0, -0.00001], [2.5, 3.0]])) == "v 1.0000 -0.0000\nv 2.5000 3.0000\n"
+
+def test_format_faces():
+    polyStart = np.array([0, 3, 7])
+    assert _formatFaces("%d", polyStart, np.arange(1, 8)) == "f 1 2 3\nf 4 5 6 7\n"
+    values = np.column_stack((np.arange(1, 8), np.arange(11, 18)))
+    assert _formatFaces("%d/%d", polyStart, values) == "f 1/11 2/12 3/13\nf 4/14 5/15 6/16 7/17\n"
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from makeclothes.mhmesh import weldUVs
+from makeclothes.synthetic import syntheticMesh
+
+def test_same_vertex_and_uv_is_one_texture_vertex():
+    # two triangles sharing the edge 1-2 with the same UVs there
+    #
+    polyVertices = np.array([0, 1, 2, 2, 1, 3])
+    uvs = np.array([[0, 0], [1, 0], [0, 1], [0, 1], [1, 0], [1, 1]], dtype=np.float32)
+    (uvFaceVerts, texVerts) = weldUVs(polyVertices, uvs)
+    assert uvFaceVerts.tolist() == [0, 1, 2, 2, 1, 3]
+    assert texVerts.tolist() == [[0, 0], [1, 0], [0, 1], [1, 1]]
+
+def test_seam_is_kept():
+    # same polygons, but vertex 1 has different UVs in both polygons
+    #
+    polyVertices = np.array([0, 1, 2, 2, 1, 3])
+    uvs = np.array([[0, 0], [1, 0], [0, 1], [0, 1], [0.5, 0], [1, 1]], dtype=np.float32)
+    (uvFaceVerts, texVerts) = weldUVs(polyVertices, uvs)
+    assert uvFaceVerts.tolist() == [0, 1, 2, 2, 3, 4]
+    assert len(texVerts) == 5
+
+def test_same_uv_of_different_vertices_is_not_welded():
+    polyVertices = np.array([0, 1, 2, 3, 4, 5])
+    uvs = np.zeros((6, 2), dtype=np.float32)
+    (uvFaceVerts, texVerts) = weldUVs(polyVertices, uvs)
+    assert uvFaceVerts.tolist() == [0, 1, 2, 3, 4, 5]
+
+def test_cylinder():
+    # every vertex has one texture vertex, the vertices of the first column two (u = 0 and u = 1 at the seam)
+    #
+    mesh = syntheticMesh(2000, 4, 1.0, 2.0, 0.0, 0.0)
+    (uvFaceVerts, texVerts) = weldUVs(mesh["polyVertices"], mesh["uvs"])
+    numVerts = len(mesh["coords"])
+    rows = len(np.unique(mesh["coords"][:, 2]))
+    assert len(texVerts) == numVerts + rows
+
+    # each loop gets its own UV back, a texture vertex belongs to exactly one vertex
+    #
+    assert np.allclose(texVerts[uvFaceVerts], mesh["uvs"])
+    owner = np.full(len(texVerts), -1)
+    owner[uvFaceVerts] = mesh["polyVertices"]
+    assert (owner[uvFaceVerts] == mesh["polyVertices"]).all()
+
+    # numbered in order of first appearance
+    #
+    (values, first) = np.unique(uvFaceVerts, return_index=True)
+    assert (np.diff(first) > 0).all()